@@ -0,0 +1,37 @@
+"""add travel list indexes
+
+Revision ID: c4e1a7b9d302
+Revises: 8d2e4b6a1c90
+Create Date: 2026-10-18 18:02:44.513927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1a7b9d302'
+down_revision = '8d2e4b6a1c90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Indexes are built concurrently, so the bot keeps writing to the tables meanwhile.
+    # travel_access needs no index, its primary key (user_id, travel_id) starts with user_id
+    with op.get_context().autocommit_block():
+        op.create_index('ix_travels_owner_id_id', 'travels', ['owner_id', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_travel_locations_travel_id_start_date', 'travel_locations',
+                        ['travel_id', 'start_date', 'id'], unique=False, postgresql_include=['city', 'end_date'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_travel_notes_travel_id_id', 'travel_notes', ['travel_id', 'id'], unique=False,
+                        postgresql_include=['file_name', 'is_public'], postgresql_concurrently=True)
+    op.execute(sa.text("ANALYZE travels, travel_locations, travel_notes"))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_travel_notes_travel_id_id', table_name='travel_notes', postgresql_concurrently=True)
+        op.drop_index('ix_travel_locations_travel_id_start_date', table_name='travel_locations',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_travels_owner_id_id', table_name='travels', postgresql_concurrently=True)
@@ -0,0 +1,64 @@
+"""
+Compare queries per second of the old sync engine without a pool and the async pooled engine.
+
+Usage: python -m benchmarks.bench_db_engine [queries] [concurrency]
+
+Runs against POSTGRES_CONN, the database must be migrated. Every query is a user lookup by id
+in its own session, like a handler does. The sync engine blocks the event loop, so its queries
+run one after another whatever the concurrency is.
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import create_engine, NullPool, select
+from sqlalchemy.orm import sessionmaker
+
+import config
+from database.database_connector import engine, session_maker
+from database.models import User
+
+
+def run_sync(queries: int) -> float:
+    sync_session_maker = sessionmaker(create_engine(config.database_url, poolclass=NullPool))
+    started = time.perf_counter()
+    for i in range(queries):
+        with sync_session_maker() as session:
+            session.execute(select(User).where(User.id == i)).scalar()
+    return time.perf_counter() - started
+
+
+async def run_async(queries: int, concurrency: int) -> float:
+    ids = iter(range(queries))
+
+    async def worker():
+        for i in ids:
+            async with session_maker() as session:
+                await session.scalar(select(User).where(User.id == i))
+
+    async def connect():
+        async with engine.connect() as connection:
+            await connection.execute(select(1))
+
+    # Open the pool connections first, a running bot does not pay for connecting
+    await asyncio.gather(*[connect() for _ in range(min(concurrency, config.db_pool_size))])
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed
+
+
+def main():
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    sync_time = run_sync(queries)
+    async_time = asyncio.run(run_async(queries, concurrency))
+    print(f"queries: {queries}, concurrency: {concurrency}, pool size: {config.db_pool_size}")
+    print(f"sync, NullPool: {queries / sync_time:8.0f} queries/s")
+    print(f"async, pooled:  {queries / async_time:8.0f} queries/s")
+    print(f"speedup: {sync_time / async_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
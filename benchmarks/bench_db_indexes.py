@@ -0,0 +1,102 @@
+"""
+Query plans and timings of the list screens before and after the travel list indexes, on seeded tables.
+
+Usage: python -m benchmarks.bench_db_indexes [rows] [repeats]
+
+Runs against POSTGRES_CONN in a separate bench_indexes schema, which is dropped afterwards. travel_locations
+and travel_notes get rows rows each (1M by default), travels and travel_access a quarter of it and users
+a tenth. Every query is shown with EXPLAIN (ANALYZE, BUFFERS) and timed as the average of repeats runs.
+"""
+import sys
+import time
+
+from sqlalchemy import create_engine, select, text, Connection
+from sqlalchemy.dialects import postgresql
+
+import config
+from database.database_connector import SqlAlchemyBase
+from database.models import TravelLocation
+from database.pages import get_travel_page_queries, get_location_page_queries, get_note_page_queries
+
+SCHEMA = "bench_indexes"
+TABLES = ("users", "travels", "travel_access", "travel_locations", "travel_notes")
+INDEXES = ("ix_travels_owner_id_id", "ix_travel_locations_travel_id_start_date", "ix_travel_notes_travel_id_id")
+SEED = (
+    "INSERT INTO users (id, name) SELECT i, 'user ' || i FROM generate_series(1, :users) i",
+    "INSERT INTO travels (id, title, owner_id) SELECT i, 'travel ' || i, 1 + i % :users "
+    "FROM generate_series(1, :travels) i",
+    "INSERT INTO travel_access (user_id, travel_id) SELECT 1 + (i * 7 + 3) % :users, i "
+    "FROM generate_series(1, :travels) i",
+    "INSERT INTO travel_locations (id, city, start_date, end_date, latitude, longitude, travel_id) "
+    "SELECT i, 'city ' || i, date '2024-01-01' + i % 365, date '2024-01-04' + i % 365, '54.7', '20.5', "
+    "1 + i % :travels FROM generate_series(1, :rows) i",
+    "INSERT INTO travel_notes (id, file_id, file_name, is_public, travel_id) "
+    "SELECT i, 'file ' || i, 'note ' || i, i % 2 = 0, 1 + i % :travels FROM generate_series(1, :rows) i",
+)
+
+
+def get_queries(user_id: int, travel_id: int) -> dict[str, str]:
+    queries = {"travel card locations": select(TravelLocation).where(TravelLocation.travel_id.in_([travel_id]))}
+    for name, (rows, count) in [("travel list", get_travel_page_queries(user_id, 0)),
+                                ("location list", get_location_page_queries(travel_id, 0)),
+                                ("note list", get_note_page_queries(travel_id, True, 0))]:
+        queries[f"{name} rows"] = rows
+        queries[f"{name} count"] = count
+    return {name: str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            for name, query in queries.items()}
+
+
+def measure(connection: Connection, queries: dict[str, str], repeats: int) -> dict[str, tuple[str, float]]:
+    results = {}
+    for name, sql in queries.items():
+        plan = "\n".join(row[0] for row in connection.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+        started = time.perf_counter()
+        for _ in range(repeats):
+            connection.exec_driver_sql(sql).all()
+        results[name] = plan, (time.perf_counter() - started) / repeats * 1000
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tables = [SqlAlchemyBase.metadata.tables[name] for name in TABLES]
+    indexes = [index for table in tables for index in table.indexes if index.name in INDEXES]
+    queries = get_queries(user_id=1, travel_id=1)
+    with create_engine(config.database_url).connect() as connection:
+        connection.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.exec_driver_sql(f"CREATE SCHEMA {SCHEMA}")
+        connection.exec_driver_sql(f"SET search_path TO {SCHEMA}")
+        try:
+            SqlAlchemyBase.metadata.create_all(connection, tables=tables)
+            for index in indexes:
+                index.drop(connection)
+            started = time.perf_counter()
+            for statement in SEED:
+                connection.execute(text(statement), {"rows": rows, "travels": rows // 4, "users": rows // 10})
+            connection.exec_driver_sql(f"ANALYZE {', '.join(TABLES)}")
+            connection.commit()
+            print(f"seeded {rows} rows in {time.perf_counter() - started:.1f} s")
+            before = measure(connection, queries, repeats)
+            started = time.perf_counter()
+            for index in indexes:
+                index.create(connection)
+            connection.exec_driver_sql(f"ANALYZE {', '.join(TABLES)}")
+            connection.commit()
+            print(f"indexes built in {time.perf_counter() - started:.1f} s")
+            after = measure(connection, queries, repeats)
+        finally:
+            connection.rollback()
+            connection.exec_driver_sql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            connection.commit()
+    for name in queries:
+        print(f"\n== {name}\n{queries[name]}")
+        for label, (plan, elapsed) in [("before", before[name]), ("after", after[name])]:
+            print(f"-- {label}: {elapsed:.3f} ms\n{plan}")
+    print(f"\n{'query':<24}{'before, ms':>12}{'after, ms':>12}{'speedup':>10}")
+    for name in queries:
+        print(f"{name:<24}{before[name][1]:12.3f}{after[name][1]:12.3f}{before[name][1] / after[name][1]:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare the per-point route projection loop with the vectorized projection and simplification.
+
+Usage: python -m benchmarks.bench_route_projection [points] [zoom]
+
+By default the zoom is picked the same way tools.map_draw picks it for the route bbox.
+"""
+import math
+import sys
+import timeit
+
+import mercantile
+import numpy as np
+
+from tools.geometry import project_to_web_mercator, simplify_polyline, meters_per_pixel
+
+try:
+    from cairo import ImageSurface, FORMAT_ARGB32, Context
+except ImportError:
+    ImageSurface = None
+
+
+def make_route(points: int) -> list[list[float]]:
+    # A winding driving-like route from Moscow to Saint Petersburg
+    t = np.linspace(0, 1, points)
+    lon = 37.6156 + (30.3141 - 37.6156) * t + 0.05 * np.sin(t * 60) + 0.001 * np.sin(t * 5000)
+    lat = 55.7522 + (59.9386 - 55.7522) * t + 0.05 * np.cos(t * 45) + 0.001 * np.cos(t * 4000)
+    return np.column_stack([lon, lat]).tolist()
+
+
+def draw(pixels):
+    # Stroke the route like tools.map_render does when cairo is available
+    if ImageSurface is None:
+        return
+    context = Context(ImageSurface(FORMAT_ARGB32, 1280, 1280))
+    for x, y in pixels:
+        context.line_to(x, y)
+    context.set_line_width(10)
+    context.stroke()
+
+
+def loop_projection(coordinates, left_top, kx, ky):
+    pixels = []
+    for c in coordinates:
+        x, y = mercantile.xy(c[0], c[1])
+        pixels.append(((x - left_top[0]) * kx, (y - left_top[1]) * ky))
+    draw(pixels)
+    return pixels
+
+
+def vectorized_projection(coordinates, left_top, kx, ky, zoom, tolerance=0.5):
+    route = simplify_polyline(project_to_web_mercator(coordinates), tolerance * meters_per_pixel(zoom))
+    pixels = ((route - left_top) * (kx, ky)).tolist()
+    draw(pixels)
+    return pixels
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    coordinates = make_route(points)
+    west, south = np.min(coordinates, axis=0)
+    east, north = np.max(coordinates, axis=0)
+    if len(sys.argv) > 2:
+        zoom = int(sys.argv[2])
+    else:
+        zoom = 2
+        while len(list(mercantile.tiles(west, south, east, north, zoom))) < 10:
+            zoom += 1
+    left_top = mercantile.xy(west, north)
+    kx = 1 / meters_per_pixel(zoom)
+    ky = -kx
+
+    loop_result = loop_projection(coordinates, left_top, kx, ky)
+    vectorized_result = vectorized_projection(coordinates, left_top, kx, ky, zoom)
+    projected = (project_to_web_mercator(coordinates) - left_top) * (kx, ky)
+    error = max(math.dist(a, b) for a, b in zip(loop_result, projected.tolist()))
+    loop_time = min(timeit.repeat(lambda: loop_projection(coordinates, left_top, kx, ky), number=1, repeat=5))
+    vectorized_time = min(timeit.repeat(lambda: vectorized_projection(coordinates, left_top, kx, ky, zoom),
+                                        number=1, repeat=5))
+    print(f"points: {points}, zoom: {zoom}")
+    print(f"loop:       {loop_time * 1000:8.2f} ms, {len(loop_result)} points to draw")
+    print(f"vectorized: {vectorized_time * 1000:8.2f} ms, {len(vectorized_result)} points to draw")
+    print(f"speedup: {loop_time / vectorized_time:.1f}x, projection error: {error:.2e} px, "
+          f"drawing {'included' if ImageSurface is not None else 'skipped (no cairo)'}")
+
+
+if __name__ == "__main__":
+    main()
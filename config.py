@@ -5,7 +5,53 @@ from dotenv import load_dotenv
 load_dotenv()
 bot_token = os.getenv("BOT_TOKEN")
 redis_password = os.getenv("REDIS_PASSWORD")
+redis_host = os.getenv("REDIS_HOST", "travel_bot_redis")
 database_url = os.getenv("POSTGRES_CONN")
 weather_api_token = os.getenv("WEATHER_API_TOKEN")
 opentripmap_api_token = os.getenv("OPENTRIPMAP_API_TOKEN")
 random_seed = os.getenv("RANDOM_SEED")
+tile_server_concurrency = int(os.getenv("TILE_SERVER_CONCURRENCY", "2"))
+tile_fetch_timeout = float(os.getenv("TILE_FETCH_TIMEOUT", "30"))
+tile_cache_path = os.getenv("TILE_CACHE_PATH", "cache/tiles.mbtiles")
+tile_cache_max_bytes = int(os.getenv("TILE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+tile_cache_ttl = float(os.getenv("TILE_CACHE_TTL", str(7 * 24 * 60 * 60)))
+trip_map_cache_ttl = int(os.getenv("TRIP_MAP_CACHE_TTL", str(30 * 24 * 60 * 60)))
+render_pool_size = int(os.getenv("RENDER_POOL_SIZE", str(os.cpu_count() or 1)))
+render_queue_size = int(os.getenv("RENDER_QUEUE_SIZE", str(2 * (os.cpu_count() or 1))))
+# Every render worker has its own surface cache, so they take up to SURFACE_CACHE_MAX_BYTES * RENDER_POOL_SIZE
+# together. By default 256 MB are split between the workers
+surface_cache_max_bytes = int(os.getenv("SURFACE_CACHE_MAX_BYTES", str(256 * 1024 * 1024 // max(render_pool_size, 1))))
+route_simplify_tolerance = float(os.getenv("ROUTE_SIMPLIFY_TOLERANCE", "0.5"))
+map_target_size = int(os.getenv("MAP_TARGET_SIZE", "1024"))
+map_max_tiles = int(os.getenv("MAP_MAX_TILES", "24"))
+map_min_zoom = int(os.getenv("MAP_MIN_ZOOM", "2"))
+map_max_zoom = int(os.getenv("MAP_MAX_ZOOM", "18"))
+osrm_url = os.getenv("OSRM_URL", "https://router.project-osrm.org")
+osrm_timeout = float(os.getenv("OSRM_TIMEOUT", "30"))
+route_leg_cache_ttl = int(os.getenv("ROUTE_LEG_CACHE_TTL", str(30 * 24 * 60 * 60)))
+nominatim_url = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+nominatim_user_agent = os.getenv("NOMINATIM_USER_AGENT", "some_user_agent")
+nominatim_timeout = float(os.getenv("NOMINATIM_TIMEOUT", "10"))
+geocode_cache_ttl = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 60 * 60)))
+geocode_cache_negative_ttl = int(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL", str(24 * 60 * 60)))
+geocode_cache_precision = int(os.getenv("GEOCODE_CACHE_PRECISION", "3"))
+gazetteer_path = os.getenv("GAZETTEER_PATH")
+reverse_geocoder_path = os.getenv("REVERSE_GEOCODER_PATH")
+reverse_geocoder_max_distance = float(os.getenv("REVERSE_GEOCODER_MAX_DISTANCE", "30"))
+singleflight_distributed = os.getenv("SINGLEFLIGHT_DISTRIBUTED", "0") == "1"
+singleflight_lock_timeout = float(os.getenv("SINGLEFLIGHT_LOCK_TIMEOUT", "30"))
+weather_cache_precision = int(os.getenv("WEATHER_CACHE_PRECISION", "2"))
+weather_history_cache_ttl = int(os.getenv("WEATHER_HISTORY_CACHE_TTL", str(365 * 24 * 60 * 60)))
+weather_forecast_cache_ttl = int(os.getenv("WEATHER_FORECAST_CACHE_TTL", str(3 * 60 * 60)))
+weather_future_cache_ttl = int(os.getenv("WEATHER_FUTURE_CACHE_TTL", str(24 * 60 * 60)))
+place_address_cache_ttl = int(os.getenv("PLACE_ADDRESS_CACHE_TTL", str(30 * 24 * 60 * 60)))
+places_cache_precision = int(os.getenv("PLACES_CACHE_PRECISION", "5"))
+places_cache_ttl = int(os.getenv("PLACES_CACHE_TTL", str(24 * 60 * 60)))
+weather_timeout = float(os.getenv("WEATHER_TIMEOUT", "5"))
+places_timeout = float(os.getenv("PLACES_TIMEOUT", "5"))
+db_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+db_pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+db_pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+db_statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+metrics_log_level = os.getenv("METRICS_LOG_LEVEL", "INFO")
@@ -1,12 +1,27 @@
-from sqlalchemy import create_engine, NullPool
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
+from sqlalchemy.orm import declarative_base
 
 import config
 
 
-engine = create_engine(config.database_url, poolclass=NullPool, echo=False)
-SqlAlchemyBase = declarative_base()
-session_maker = sessionmaker(engine, expire_on_commit=False)
+def get_async_url(url: str) -> URL:
+    """
+    Same database URL with the asyncpg driver and its prepared statement cache size
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return url
+    return url.set(drivername="postgresql+asyncpg").update_query_dict(
+        {"prepared_statement_cache_size": str(config.db_statement_cache_size)}
+    )
+
+
+engine = create_async_engine(get_async_url(config.database_url), pool_size=config.db_pool_size,
+                             max_overflow=config.db_max_overflow, pool_timeout=config.db_pool_timeout,
+                             pool_recycle=config.db_pool_recycle, pool_pre_ping=True, echo=False)
+SqlAlchemyBase = declarative_base(cls=AsyncAttrs)
+session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
 def load_models():
@@ -15,18 +30,10 @@ def load_models():
     from database.models import Travel # noqa: unused
     from database.models import travel_access # noqa: unused
     from database.models import TravelNote # noqa: unused
+    from database.models import GeocodeCache # noqa: unused
 
 
-def get_session():
-    """
-    Create session for work with database
-    :return: Session
-    """
-    with session_maker() as session:
-        return session
-
-
-def init_models() -> None:
+async def init_models() -> None:
     load_models()
-    with engine.begin() as conn:
-        SqlAlchemyBase.metadata.create_all(conn)
+    async with engine.begin() as conn:
+        await conn.run_sync(SqlAlchemyBase.metadata.create_all)
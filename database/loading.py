@@ -0,0 +1,32 @@
+"""
+Loading profiles of the bot screens. A profile loads the relationships a screen reads together with
+the object, so the screen costs a fixed number of statements instead of one per relationship
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from database.models import Travel, TravelLocation, TravelNote
+
+# Access check of a travel action and the location and note lists, which are paged in database.pages:
+# owner and users the travel is shared with
+TRAVEL_ACCESS = (
+    joinedload(Travel.owner),
+    selectinload(Travel.access_users),
+)
+# Travel card with its trip map and the route
+TRAVEL_INFO = TRAVEL_ACCESS + (
+    selectinload(Travel.locations),
+)
+# Location card
+LOCATION_INFO = (
+    joinedload(TravelLocation.travel).joinedload(Travel.owner),
+    joinedload(TravelLocation.travel).selectinload(Travel.access_users),
+)
+# Note card
+NOTE_INFO = (
+    joinedload(TravelNote.travel).joinedload(Travel.owner),
+    joinedload(TravelNote.travel).selectinload(Travel.access_users),
+)
+# Travel deletion, it cascades to locations, notes and access rows
+TRAVEL_DELETE = TRAVEL_INFO + (
+    selectinload(Travel.notes),
+)
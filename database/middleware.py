@@ -0,0 +1,69 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UpdateStats:
+    statements: int = 0
+    connections: int = 0
+
+
+update_stats: ContextVar[Optional[UpdateStats]] = ContextVar("update_stats", default=None)
+
+
+def count_statement(*args) -> None:
+    stats = update_stats.get()
+    if stats is not None:
+        stats.statements += 1
+
+
+def count_connection(*args) -> None:
+    stats = update_stats.get()
+    if stats is not None:
+        stats.connections += 1
+
+
+class DatabaseSessionMiddleware(BaseMiddleware):
+    """
+    Open one session per update and pass it to handlers as db_session. The transaction is committed
+    once after the handler and rolled back if the handler fails. The session checks out a pooled connection
+    at its first statement and keeps it until the end of the update, so everything that runs in the update,
+    the geocode cache included, must use db_session instead of opening its own session.
+    Statements and connection checkouts of every update are logged
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        engine = session_maker.kw["bind"].sync_engine
+        event.listen(engine, "before_cursor_execute", count_statement)
+        event.listen(engine.pool, "checkout", count_connection)
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: dict[str, Any]) -> Any:
+        stats = UpdateStats()
+        token = update_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            async with self.session_maker() as session:
+                data["db_session"] = session
+                try:
+                    result = await handler(event, data)
+                except Exception:
+                    await session.rollback()
+                    raise
+                await session.commit()
+                return result
+        finally:
+            update_stats.reset(token)
+            logger.info("Update %s: %d statements, %d connections in %.3f s", getattr(event, "update_id", None),
+                         stats.statements, stats.connections, time.perf_counter() - started)
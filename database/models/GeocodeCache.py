@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Text, DateTime, JSON
+
+from database.database_connector import SqlAlchemyBase
+
+
+class GeocodeCache(SqlAlchemyBase):
+    __tablename__ = "geocode_cache"
+
+    kind = Column(Text, primary_key=True)
+    key = Column(Text, primary_key=True)
+    response = Column(JSON)
+    expires_at = Column(DateTime, index=True)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{self.key}"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, Text, ForeignKey, UniqueConstraint, BigInteger, Index
 from sqlalchemy.orm import relationship
 
 from database.database_connector import SqlAlchemyBase
@@ -17,7 +17,10 @@ class Travel(SqlAlchemyBase):
     access_users = relationship("User", secondary="travel_access", back_populates="access_travels")
     notes = relationship("TravelNote", back_populates="travel", cascade="all,delete")
 
-    __table_args__ = (UniqueConstraint('title', 'owner_id', name='_travel_uc'),)
+    __table_args__ = (
+        UniqueConstraint('title', 'owner_id', name='_travel_uc'),
+        Index('ix_travels_owner_id_id', 'owner_id', 'id'),
+    )
 
     def __repr__(self) -> str:
         return str(self.to_dict())
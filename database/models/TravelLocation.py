@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, Date
+from sqlalchemy import Column, Integer, Text, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 
 from database.database_connector import SqlAlchemyBase
@@ -17,5 +17,10 @@ class TravelLocation(SqlAlchemyBase):
 
     travel = relationship("Travel", back_populates="locations")
 
+    __table_args__ = (
+        Index("ix_travel_locations_travel_id_start_date", "travel_id", "start_date", "id",
+              postgresql_include=["city", "end_date"]),
+    )
+
     def __repr__(self) -> str:
         return str(self.to_dict())
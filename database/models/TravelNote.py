@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey, UniqueConstraint, Boolean
+from sqlalchemy import Column, Integer, Text, ForeignKey, UniqueConstraint, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from database.database_connector import SqlAlchemyBase
@@ -17,6 +17,7 @@ class TravelNote(SqlAlchemyBase):
 
     __table_args__ = (
         UniqueConstraint("file_id", "travel_id", name="_note_travel_uc"),
+        Index("ix_travel_notes_travel_id_id", "travel_id", "id", postgresql_include=["file_name", "is_public"]),
     )
 
     def __repr__(self) -> str:
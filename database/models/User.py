@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, BigInteger
+from sqlalchemy import Column, Integer, Text, BigInteger, Float
 from sqlalchemy.orm import relationship
 
 from database.database_connector import SqlAlchemyBase
@@ -13,6 +13,8 @@ class User(SqlAlchemyBase):
     city = Column(Text(), nullable=True)
     country = Column(Text(), nullable=True)
     bio = Column(Text(), nullable=True)
+    home_latitude = Column(Float, nullable=True)
+    home_longitude = Column(Float, nullable=True)
 
     created_travels = relationship("Travel", back_populates="owner")
     access_travels = relationship("Travel", secondary="travel_access", back_populates="access_users")
@@ -3,3 +3,4 @@ from .Travel import Travel
 from .TravelLocation import TravelLocation
 from .TravelAccess import travel_access
 from .TravelNote import TravelNote
+from .GeocodeCache import GeocodeCache
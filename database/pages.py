@@ -0,0 +1,83 @@
+"""
+Pages of the travel, location and note lists. Every page is two statements, the page rows with only
+the columns its keyboard shows and the count of all rows, whatever the size of the list is
+"""
+from sqlalchemy import Row, Select, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import User, Travel, TravelLocation, TravelNote, travel_access
+
+PAGE_SIZE = 5
+
+
+def get_page_queries(rows: Select, ids: Select, offset: int) -> tuple[Select, Select]:
+    """
+    Statements of the page
+    :param rows: ordered query of the rows
+    :param ids: query of the same rows ids without joins and ordering, it is counted
+    :param offset: number of rows before the page
+    :return: page rows and total count statements
+    """
+    return rows.limit(PAGE_SIZE).offset(offset), select(func.count()).select_from(ids.subquery())
+
+
+async def get_page(db_session: AsyncSession, queries: tuple[Select, Select]) -> tuple[list[Row], int]:
+    rows, count = queries
+    total = await db_session.scalar(count)
+    page = (await db_session.execute(rows)).all()
+    return page, total
+
+
+def get_user_travel_ids(user_id: int) -> Select:
+    return union_all(
+        select(Travel.id).where(Travel.owner_id == user_id),
+        select(travel_access.c.travel_id.label("id")).where(travel_access.c.user_id == user_id),
+    )
+
+
+def get_travel_page_queries(user_id: int, offset: int) -> tuple[Select, Select]:
+    """
+    Page of own and shared travels of the user, newest first. Rows have id, title and owner_name
+    """
+    ids = get_user_travel_ids(user_id).subquery()
+    rows = select(Travel.id, Travel.title, User.name.label("owner_name")) \
+        .join(ids, ids.c.id == Travel.id) \
+        .join(User, User.id == Travel.owner_id) \
+        .order_by(Travel.id.desc())
+    return get_page_queries(rows, select(ids.c.id), offset)
+
+
+def get_location_page_queries(travel_id: int, offset: int) -> tuple[Select, Select]:
+    """
+    Page of travel locations by start date. Rows have id, city, start_date and end_date
+    """
+    condition = TravelLocation.travel_id == travel_id
+    rows = select(TravelLocation.id, TravelLocation.city, TravelLocation.start_date, TravelLocation.end_date) \
+        .where(condition) \
+        .order_by(TravelLocation.start_date, TravelLocation.id)
+    return get_page_queries(rows, select(TravelLocation.id).where(condition), offset)
+
+
+def get_note_page_queries(travel_id: int, public_only: bool, offset: int) -> tuple[Select, Select]:
+    """
+    Page of travel notes, newest first. Rows have id and file_name
+    :param public_only: skip private notes, for users other than the owner
+    """
+    condition = TravelNote.travel_id == travel_id
+    if public_only:
+        condition &= TravelNote.is_public.is_(True)
+    rows = select(TravelNote.id, TravelNote.file_name).where(condition).order_by(TravelNote.id.desc())
+    return get_page_queries(rows, select(TravelNote.id).where(condition), offset)
+
+
+async def get_travel_page(db_session: AsyncSession, user_id: int, offset: int) -> tuple[list[Row], int]:
+    return await get_page(db_session, get_travel_page_queries(user_id, offset))
+
+
+async def get_location_page(db_session: AsyncSession, travel_id: int, offset: int) -> tuple[list[Row], int]:
+    return await get_page(db_session, get_location_page_queries(travel_id, offset))
+
+
+async def get_note_page(db_session: AsyncSession, travel_id: int, public_only: bool,
+                        offset: int) -> tuple[list[Row], int]:
+    return await get_page(db_session, get_note_page_queries(travel_id, public_only, offset))
@@ -0,0 +1,5 @@
+from redis.asyncio import Redis
+
+import config
+
+redis = Redis(host=config.redis_host, password=config.redis_password)
@@ -4,12 +4,14 @@ from aiogram import Router, types, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import BufferedInputFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database_connector import get_session
+from database.loading import TRAVEL_ACCESS, TRAVEL_INFO, TRAVEL_DELETE, LOCATION_INFO, NOTE_INFO
 from database.models import User, Travel, TravelLocation, TravelNote
 from tools.helpers import send_travel_info, get_paginated_travel_list, get_paginated_travel_locations_list, \
     get_city_and_country, get_location_info, send_travel_location_info, get_paginated_travel_notes_list, \
-    send_travel_note_info
+    send_travel_note_info, fill_home_coordinates, get_incorrect_city_text
 from tools.map_draw import get_trip_route
 from tools.markups import TravelMenuCallbackFactory, \
     TravelMenuActions, TravelListPaginationCallbackFactory, TravelListCallbackFactory, TravelCallbackFactory, \
@@ -21,23 +23,26 @@ from tools.markups import TravelMenuCallbackFactory, \
 from tools.states import CreateTravel, EditTravel, CreateTravelLocation, AddUserToTravel, CreateTravelNote
 from translations import ENTER_TRAVEL_TITLE, TRAVEL_TITLE_CONFLICT, TRAVEL_DELETED, TRAVEL_TEXT, \
     ENTER_TRAVEL_DESCRIPTION, ENTER_TRAVEL_LOCATION, ENTER_TRAVEL_LOCATION_START_DATE, ENTER_TRAVEL_LOCATION_END_DATE, \
-    WRONG_DATE_FORMAT, LOCATION_IS_NOT_RECOGNIZED, INCORRECT_CITY, ACCESS_DENIED, SEND_USER_FORWARD, \
+    WRONG_DATE_FORMAT, LOCATION_IS_NOT_RECOGNIZED, ACCESS_DENIED, SEND_USER_FORWARD, \
     SEND_USER_NOT_FORWARDED, SEND_USER_ALREADY_ADDED, NOT_FOUND, SEND_USER_ADDED, UPLOAD_NOTE_FILE, LOADING
 
 router = Router()
+# Relationships each travel action reads, the other actions only check access
+TRAVEL_ACTION_PROFILES = {
+    TravelActions.DELETE: TRAVEL_DELETE,
+    TravelActions.SHOW_ROUTE: TRAVEL_INFO,
+}
 
 
 @router.callback_query(TravelMenuCallbackFactory.filter())
 async def handle_travel_menu_callback(callback: types.CallbackQuery, callback_data: TravelMenuCallbackFactory,
-                                      state: FSMContext):
+                                      state: FSMContext, db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
     if callback_data.action == TravelMenuActions.CREATE:
         await state.set_state(CreateTravel.entering_title)
         await callback.message.edit_text(ENTER_TRAVEL_TITLE)
     if callback_data.action == TravelMenuActions.LIST:
-        db_session = get_session()
-        user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
-        text, markup = get_paginated_travel_list(user_model)
+        text, markup = await get_paginated_travel_list(db_session, callback.from_user.id)
         await callback.message.edit_text(text, reply_markup=markup)
     await callback.answer()
     await message.delete()
@@ -45,21 +50,21 @@ async def handle_travel_menu_callback(callback: types.CallbackQuery, callback_da
 
 @router.callback_query(TravelListPaginationCallbackFactory.filter())
 async def handle_travel_list_pagination_callback(callback: types.CallbackQuery,
-                                                 callback_data: TravelListPaginationCallbackFactory):
+                                                 callback_data: TravelListPaginationCallbackFactory,
+                                                 db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
-    text, markup = get_paginated_travel_list(user_model, callback_data.offset)
+    text, markup = await get_paginated_travel_list(db_session, callback.from_user.id, callback_data.offset)
     await callback.message.edit_text(text, reply_markup=markup)
     await callback.answer()
     await message.delete()
 
 
 @router.callback_query(TravelListCallbackFactory.filter())
-async def handle_travel_list_callback(callback: types.CallbackQuery, callback_data: TravelListCallbackFactory):
+async def handle_travel_list_callback(callback: types.CallbackQuery, callback_data: TravelListCallbackFactory,
+                                      db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == callback_data.travel_id).first()
+    travel_model = await db_session.scalar(select(Travel).options(*TRAVEL_INFO).where(
+        Travel.id == callback_data.travel_id))
     await send_travel_info(callback, travel_model)
     await callback.answer()
     await message.delete()
@@ -67,11 +72,11 @@ async def handle_travel_list_callback(callback: types.CallbackQuery, callback_da
 
 @router.callback_query(TravelCallbackFactory.filter())
 async def handle_travel_callback(callback: types.CallbackQuery, callback_data: TravelCallbackFactory,
-                                 state: FSMContext):
+                                 state: FSMContext, db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == callback_data.travel_id).first()
-    user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
+    travel_model = await db_session.scalar(select(Travel).options(
+        *TRAVEL_ACTION_PROFILES.get(callback_data.action, TRAVEL_ACCESS)).where(Travel.id == callback_data.travel_id))
+    user_model = await db_session.scalar(select(User).where(User.id == callback.from_user.id))
     if callback_data.action == TravelActions.ADD_USER:
         if travel_model.owner_id != callback.from_user.id:
             await message.delete()
@@ -84,8 +89,7 @@ async def handle_travel_callback(callback: types.CallbackQuery, callback_data: T
         if travel_model.owner_id != callback.from_user.id:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
-        db_session.delete(travel_model)
-        db_session.commit()
+        await db_session.delete(travel_model)
         await callback.answer(TRAVEL_DELETED)
         await callback.message.edit_text(TRAVEL_TEXT, reply_markup=get_travels_keyboard_markup())
     if callback_data.action == TravelActions.EDIT:
@@ -98,33 +102,34 @@ async def handle_travel_callback(callback: types.CallbackQuery, callback_data: T
         await callback.answer()
     if callback_data.action == TravelActions.EDIT_POINTS:
         if callback.from_user.id != travel_model.owner_id and callback.from_user.id not in [user.id for user in
-                                                                                            travel_model.access_users]:
+                                                                                            await travel_model.awaitable_attrs.access_users]:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
-        text, markup = get_paginated_travel_locations_list(user_model, travel_model)
+        text, markup = await get_paginated_travel_locations_list(db_session, user_model, travel_model)
         await callback.message.edit_text(text, reply_markup=markup)
         await callback.answer()
     if callback_data.action == TravelActions.SHOW_ROUTE:
         if callback.from_user.id != travel_model.owner_id and callback.from_user.id not in [user.id for user in
-                                                                                            travel_model.access_users]:
+                                                                                            await travel_model.awaitable_attrs.access_users]:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
-        if len(travel_model.locations) >= 1:
-            file = get_trip_route(travel_model, user_model)
-            if file is None:
+        if len(await travel_model.awaitable_attrs.locations) >= 1:
+            if user_model.home_latitude is None or user_model.home_longitude is None:
+                await fill_home_coordinates(db_session, user_model)
+            png = await get_trip_route(travel_model, user_model)
+            if png is None:
                 await callback.answer("Маршрут не может быть построен. Вы уже находитесь в стартовой точке маршрута.")
             else:
-                await callback.message.answer_photo(BufferedInputFile(file.read(), filename="map.png"))
-                file.close()
+                await callback.message.answer_photo(BufferedInputFile(png, filename="map.png"))
                 await callback.message.delete()
                 await send_travel_info(callback, travel_model)
         await callback.answer()
     if callback_data.action == TravelActions.SHOW_NOTES:
         if callback.from_user.id != travel_model.owner_id and callback.from_user.id not in [user.id for user in
-                                                                                            travel_model.access_users]:
+                                                                                            await travel_model.awaitable_attrs.access_users]:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
-        text, markup = get_paginated_travel_notes_list(user_model, travel_model)
+        text, markup = await get_paginated_travel_notes_list(db_session, user_model, travel_model)
         await callback.message.edit_text(text, reply_markup=markup)
         await callback.answer()
     await message.delete()
@@ -132,15 +137,16 @@ async def handle_travel_callback(callback: types.CallbackQuery, callback_data: T
 
 @router.callback_query(TravelLocationsListPaginationCallbackFactory.filter())
 async def handle_travel_locations_list_pagination_callback(callback: types.CallbackQuery,
-                                                           callback_data: TravelLocationsListPaginationCallbackFactory):
+                                                           callback_data: TravelLocationsListPaginationCallbackFactory,
+                                                           db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == callback_data.travel_id).first()
-    user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
+    travel_model = await db_session.scalar(select(Travel).options(*TRAVEL_ACCESS).where(
+        Travel.id == callback_data.travel_id))
+    user_model = await db_session.scalar(select(User).where(User.id == callback.from_user.id))
     if travel_model.owner_id != callback.from_user.id or callback.from_user.id not in [user.id for user in
-                                                                                       travel_model.access_users]:
+                                                                                       await travel_model.awaitable_attrs.access_users]:
         return await callback.answer(ACCESS_DENIED)
-    text, markup = get_paginated_travel_locations_list(user_model, travel_model, callback_data.offset)
+    text, markup = await get_paginated_travel_locations_list(db_session, user_model, travel_model, callback_data.offset)
     await callback.message.edit_text(text, reply_markup=markup)
     await callback.answer()
     await message.delete()
@@ -148,10 +154,10 @@ async def handle_travel_locations_list_pagination_callback(callback: types.Callb
 
 @router.callback_query(TravelLocationCreateCallbackFactory.filter())
 async def handle_travel_location_create_callback(callback: types.CallbackQuery,
-                                                 callback_data: TravelLocationCreateCallbackFactory, state: FSMContext):
+                                                 callback_data: TravelLocationCreateCallbackFactory, state: FSMContext,
+                                                 db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == callback_data.travel_id).first()
+    travel_model = await db_session.scalar(select(Travel).where(Travel.id == callback_data.travel_id))
     if travel_model.owner_id != callback.from_user.id:
         return await callback.answer(ACCESS_DENIED)
     await state.set_state(CreateTravelLocation.entering_location)
@@ -162,29 +168,27 @@ async def handle_travel_location_create_callback(callback: types.CallbackQuery,
 
 
 @router.callback_query(TravelLocationCallbackFactory.filter())
-async def handle_travel_location_callback(callback: types.CallbackQuery, callback_data: TravelLocationCallbackFactory):
+async def handle_travel_location_callback(callback: types.CallbackQuery, callback_data: TravelLocationCallbackFactory,
+                                          db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_location = db_session.query(TravelLocation).filter(
-        TravelLocation.id == callback_data.location_id).first()
+    travel_location = await db_session.scalar(select(TravelLocation).options(*LOCATION_INFO).where(
+        TravelLocation.id == callback_data.location_id))
     if travel_location is None:
         await message.delete()
         return await callback.answer(NOT_FOUND)
+    travel_model = await travel_location.awaitable_attrs.travel
     if callback_data.action == TravelLocationActions.DELETE:
-        travel_model = travel_location.travel
         if travel_model.owner_id != callback.from_user.id:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
-        db_session.delete(travel_location)
-        db_session.commit()
-        user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
-        text, markup = get_paginated_travel_locations_list(user_model, travel_model)
+        await db_session.delete(travel_location)
+        user_model = await db_session.scalar(select(User).where(User.id == callback.from_user.id))
+        text, markup = await get_paginated_travel_locations_list(db_session, user_model, travel_model)
         await callback.message.edit_text(text, reply_markup=markup)
         await callback.answer()
     if callback_data.action == TravelLocationActions.SHOW:
-        if callback.from_user.id != travel_location.travel.owner_id and callback.from_user.id not in [user.id for user
-                                                                                                      in
-                                                                                                      travel_location.travel.access_users]:
+        if callback.from_user.id != travel_model.owner_id and callback.from_user.id not in [user.id for user in
+                                                                                            await travel_model.awaitable_attrs.access_users]:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
         await send_travel_location_info(callback, travel_location)
@@ -194,45 +198,46 @@ async def handle_travel_location_callback(callback: types.CallbackQuery, callbac
 
 @router.callback_query(TravelNoteListPaginationCallbackFactory.filter())
 async def handle_travel_note_list_pagination_callback(callback: types.CallbackQuery,
-                                                      callback_data: TravelNoteListPaginationCallbackFactory):
+                                                      callback_data: TravelNoteListPaginationCallbackFactory,
+                                                      db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == callback_data.travel_id).first()
-    user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
+    travel_model = await db_session.scalar(select(Travel).options(*TRAVEL_ACCESS).where(
+        Travel.id == callback_data.travel_id))
+    user_model = await db_session.scalar(select(User).where(User.id == callback.from_user.id))
     if travel_model.owner_id != callback.from_user.id or callback.from_user.id not in [user.id for user in
-                                                                                       travel_model.access_users]:
+                                                                                       await travel_model.awaitable_attrs.access_users]:
         await message.delete()
         return await callback.answer(ACCESS_DENIED)
-    text, markup = get_paginated_travel_notes_list(user_model, travel_model, callback_data.offset)
+    text, markup = await get_paginated_travel_notes_list(db_session, user_model, travel_model, callback_data.offset)
     await callback.message.edit_text(text, reply_markup=markup)
     await callback.answer()
     await message.delete()
 
 
 @router.callback_query(TravelNoteCallbackFactory.filter())
-async def handle_travel_note_callback(callback: types.CallbackQuery, callback_data: TravelNoteCallbackFactory):
+async def handle_travel_note_callback(callback: types.CallbackQuery, callback_data: TravelNoteCallbackFactory,
+                                      db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_note = db_session.query(TravelNote).filter(TravelNote.id == callback_data.note_id).first()
+    travel_note = await db_session.scalar(select(TravelNote).options(*NOTE_INFO).where(
+        TravelNote.id == callback_data.note_id))
     if travel_note is None:
         await message.delete()
         return await callback.answer(NOT_FOUND)
+    travel_model = await travel_note.awaitable_attrs.travel
     if callback_data.action == TravelNoteActions.DELETE:
-        travel_model = travel_note.travel
         if travel_model.owner_id != callback.from_user.id:
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
-        db_session.delete(travel_note)
-        db_session.commit()
-        user_model = db_session.query(User).filter(User.id == callback.from_user.id).first()
-        text, markup = get_paginated_travel_notes_list(user_model, travel_model)
+        await db_session.delete(travel_note)
+        user_model = await db_session.scalar(select(User).where(User.id == callback.from_user.id))
+        text, markup = await get_paginated_travel_notes_list(db_session, user_model, travel_model)
         await callback.message.answer(text, reply_markup=markup)
         await callback.message.delete()
         await callback.answer()
     if callback_data.action == TravelNoteActions.SHOW:
-        if callback.from_user.id != travel_note.travel.owner_id and callback.from_user.id not in [user.id for user in
-                                                                                                  travel_note.travel.access_users] \
-                or (callback.from_user.id != travel_note.travel.owner_id and not travel_note.is_public):
+        if callback.from_user.id != travel_model.owner_id and callback.from_user.id not in [user.id for user in
+                                                                                            await travel_model.awaitable_attrs.access_users] \
+                or (callback.from_user.id != travel_model.owner_id and not travel_note.is_public):
             await message.delete()
             return await callback.answer(ACCESS_DENIED)
         await send_travel_note_info(callback, travel_note)
@@ -242,10 +247,10 @@ async def handle_travel_note_callback(callback: types.CallbackQuery, callback_da
 
 @router.callback_query(TravelNoteCreateCallbackFactory.filter())
 async def handle_travel_note_create_callback(callback: types.CallbackQuery,
-                                             callback_data: TravelNoteCreateCallbackFactory, state: FSMContext):
+                                             callback_data: TravelNoteCreateCallbackFactory, state: FSMContext,
+                                             db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == callback_data.travel_id).first()
+    travel_model = await db_session.scalar(select(Travel).where(Travel.id == callback_data.travel_id))
     if travel_model.owner_id != callback.from_user.id:
         await message.delete()
         return await callback.answer(ACCESS_DENIED)
@@ -258,21 +263,19 @@ async def handle_travel_note_create_callback(callback: types.CallbackQuery,
 
 @router.callback_query(TravelNoteVisibilityCallbackFactory.filter(), StateFilter(CreateTravelNote.choice_visibility))
 async def handle_travel_note_visibility_callback(callback: types.CallbackQuery,
-                                                 callback_data: TravelNoteVisibilityCallbackFactory, state: FSMContext):
+                                                 callback_data: TravelNoteVisibilityCallbackFactory, state: FSMContext,
+                                                 db_session: AsyncSession):
     message = await callback.message.answer(LOADING)
-    db_session = get_session()
-    travel_note = db_session.query(TravelNote).filter(
-        TravelNote.id == (await state.get_data())["note_id"]).first()
+    travel_note = await db_session.scalar(select(TravelNote).options(*NOTE_INFO).where(
+        TravelNote.id == (await state.get_data())["note_id"]))
     if travel_note is None:
         await message.delete()
         return await callback.answer(NOT_FOUND)
-    if travel_note.travel.owner_id != callback.from_user.id:
+    if (await travel_note.awaitable_attrs.travel).owner_id != callback.from_user.id:
         await message.delete()
         return await callback.answer(ACCESS_DENIED)
     travel_note.is_public = callback_data.action == TravelNoteVisibilityActions.PUBLIC
     db_session.add(travel_note)
-    db_session.commit()
-    db_session.refresh(travel_note)
     await state.clear()
     await send_travel_note_info(callback, travel_note)
     await callback.answer()
@@ -280,36 +283,33 @@ async def handle_travel_note_visibility_callback(callback: types.CallbackQuery,
 
 
 @router.message(StateFilter(CreateTravel.entering_title))
-async def enter_title(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    user_model = db_session.query(User).filter(User.id == message.from_user.id).first()
+async def enter_title(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    user_model = await db_session.scalar(select(User).where(User.id == message.from_user.id))
     travel_model = Travel(title=message.text, owner=user_model)
     db_session.add(travel_model)
     try:
-        db_session.commit()
+        await db_session.flush()
     except:
+        await db_session.rollback()
         return await message.answer(TRAVEL_TITLE_CONFLICT)
-    db_session.refresh(travel_model)
     await state.clear()
     await send_travel_info(message, travel_model)
 
 
 @router.message(StateFilter(EditTravel.entering_description))
-async def enter_description(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == (await state.get_data())["travel_id"]).first()
+async def enter_description(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    travel_model = await db_session.scalar(select(Travel).options(*TRAVEL_INFO).where(
+        Travel.id == (await state.get_data())["travel_id"]))
     travel_model.description = message.text
-    db_session.commit()
     await state.clear()
     await send_travel_info(message, travel_model)
 
 
 @router.message(lambda message: message.content_type == "location", StateFilter(CreateTravelLocation.entering_location))
-async def handle_location(message: types.Message, state: FSMContext):
-    db_session = get_session()
+async def handle_location(message: types.Message, state: FSMContext, db_session: AsyncSession):
     travel_location = TravelLocation(travel_id=(await state.get_data())["travel_id"])
     try:
-        location_info = get_location_info(message.location.latitude, message.location.longitude)
+        location_info = await get_location_info(db_session, message.location.latitude, message.location.longitude)
     except IndexError:
         return await message.answer(LOCATION_IS_NOT_RECOGNIZED)
     if location_info.city is None:
@@ -318,76 +318,73 @@ async def handle_location(message: types.Message, state: FSMContext):
     travel_location.latitude = message.location.latitude
     travel_location.longitude = message.location.longitude
     db_session.add(travel_location)
-    db_session.commit()
+    await db_session.flush()
     await state.set_state(CreateTravelLocation.entering_start_date)
     await state.set_data({"location_id": travel_location.id})
     await message.answer(ENTER_TRAVEL_LOCATION_START_DATE)
 
 
 @router.message(StateFilter(CreateTravelLocation.entering_location))
-async def enter_location(message: types.Message, state: FSMContext):
-    db_session = get_session()
+async def enter_location(message: types.Message, state: FSMContext, db_session: AsyncSession):
     travel_location = TravelLocation(travel_id=(await state.get_data())["travel_id"])
     try:
-        city_info = get_city_and_country(message.text)
+        city_info = await get_city_and_country(db_session, message.text)
     except IndexError:
-        return await message.answer(INCORRECT_CITY)
+        return await message.answer(get_incorrect_city_text(message.text))
     travel_location.city = city_info["name"]
     travel_location.latitude = city_info["lat"]
     travel_location.longitude = city_info["lon"]
     db_session.add(travel_location)
-    db_session.commit()
+    await db_session.flush()
     await state.set_state(CreateTravelLocation.entering_start_date)
     await state.set_data({"location_id": travel_location.id})
     await message.answer(ENTER_TRAVEL_LOCATION_START_DATE)
 
 
 @router.message(StateFilter(CreateTravelLocation.entering_start_date))
-async def enter_start_date(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    travel_location = db_session.query(TravelLocation).filter(
-        TravelLocation.id == (await state.get_data())["location_id"]).first()
+async def enter_start_date(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    travel_location = await db_session.scalar(select(TravelLocation).where(
+        TravelLocation.id == (await state.get_data())["location_id"]))
     try:
         travel_location.start_date = datetime.datetime.strptime(message.text, "%d.%m.%Y")
     except ValueError:
         return await message.answer(WRONG_DATE_FORMAT)
     db_session.add(travel_location)
-    db_session.commit()
     await state.set_state(CreateTravelLocation.entering_end_date)
     await message.answer(ENTER_TRAVEL_LOCATION_END_DATE)
 
 
 @router.message(StateFilter(CreateTravelLocation.entering_end_date))
-async def enter_end_date(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    travel_location = db_session.query(TravelLocation).filter(
-        TravelLocation.id == (await state.get_data())["location_id"]).first()
+async def enter_end_date(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    travel_location = await db_session.scalar(select(TravelLocation).options(*LOCATION_INFO).where(
+        TravelLocation.id == (await state.get_data())["location_id"]))
     try:
         travel_location.end_date = datetime.datetime.strptime(message.text, "%d.%m.%Y")
     except ValueError:
         return await message.answer(WRONG_DATE_FORMAT)
     db_session.add(travel_location)
-    db_session.commit()
-    db_session.refresh(travel_location)
+    await db_session.flush()
+    await db_session.refresh(travel_location, ["end_date"])
     await state.clear()
     await send_travel_location_info(message, travel_location)
 
 
 @router.message(StateFilter(AddUserToTravel.send_user_forward), F.forward_from)
-async def send_user_forward(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    travel_model = db_session.query(Travel).filter(Travel.id == (await state.get_data())["travel_id"]).first()
-    user_model = db_session.query(User).filter(User.id == message.forward_from.id).first()
+async def send_user_forward(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    travel_model = await db_session.scalar(select(Travel).options(*TRAVEL_INFO).where(
+        Travel.id == (await state.get_data())["travel_id"]))
+    user_model = await db_session.scalar(select(User).where(User.id == message.forward_from.id))
     if user_model is None or travel_model.owner_id == user_model.id:
         return await message.answer(SEND_USER_NOT_FORWARDED)
-    travel_model.access_users.append(user_model)
+    (await travel_model.awaitable_attrs.access_users).append(user_model)
     db_session.add(travel_model)
     try:
-        db_session.commit()
+        await db_session.flush()
     except:
         await message.answer(SEND_USER_ALREADY_ADDED)
         await state.clear()
-        db_session.rollback()
+        await db_session.rollback()
+        await db_session.refresh(travel_model)
         await send_travel_info(message, travel_model)
         return
     for user in travel_model.access_users:
@@ -403,13 +400,11 @@ async def send_user_not_forward(message: types.Message):
 
 
 @router.message(StateFilter(CreateTravelNote.upload_file), F.document)
-async def upload_file(message: types.Message, state: FSMContext):
-    db_session = get_session()
+async def upload_file(message: types.Message, state: FSMContext, db_session: AsyncSession):
     travel_note = TravelNote(travel_id=(await state.get_data())["travel_id"], file_name=message.document.file_name,
                              file_id=message.document.file_id)
     db_session.add(travel_note)
-    db_session.commit()
-    db_session.refresh(travel_note)
+    await db_session.flush()
     await state.set_state(CreateTravelNote.choice_visibility)
     await state.set_data({"note_id": travel_note.id})
     await message.answer("Выбери видимость заметки.",
@@ -5,27 +5,37 @@ from aiogram import Bot, Dispatcher, types, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.redis import RedisStorage
-from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from config import bot_token, redis_password
-from database.database_connector import get_session
+import config
+from database.database_connector import session_maker
+from database.middleware import DatabaseSessionMiddleware
 from database.models import User
+from database.redis_connector import redis
 from handlers import profile, menu, registration, travel
+from tools.geocoding import geocoder
 from tools.helpers import send_menu
+from tools.http_sessions import close_sessions
+from tools.render_engine import render_engine
 from tools.states import RegisterUser
 from translations import REGISTRATION_ENTER_AGE
 
-bot = Bot(token=bot_token)
-dp = Dispatcher(storage=RedisStorage(redis=Redis(host="travel_bot_redis", password=redis_password)))
+bot = Bot(token=config.bot_token)
+dp = Dispatcher(storage=RedisStorage(redis=redis))
+dp.update.middleware(DatabaseSessionMiddleware(session_maker))
 logging.basicConfig(level=logging.ERROR)
+# Per-update database usage, page section timings and render metrics are logged whatever the level
+# of the other logs is
+for metrics_logger in ("database.middleware", "tools.helpers", "tools.map_draw"):
+    logging.getLogger(metrics_logger).setLevel(config.metrics_log_level)
 
 main_router = Router()
 
 
 @main_router.message(Command("start"))
-async def cmd_start(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    user_data = db_session.query(User).filter(User.id == message.from_user.id).first()
+async def cmd_start(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    user_data = await db_session.scalar(select(User).where(User.id == message.from_user.id))
     await state.clear()
     if user_data is None:
         await state.set_state(RegisterUser.entering_age)
@@ -34,9 +44,8 @@ async def cmd_start(message: types.Message, state: FSMContext):
 
 
 @main_router.message()
-async def fallback(message: types.Message, state: FSMContext):
-    db_session = get_session()
-    user_data = db_session.query(User).filter(User.id == message.from_user.id).first()
+async def fallback(message: types.Message, state: FSMContext, db_session: AsyncSession):
+    user_data = await db_session.scalar(select(User).where(User.id == message.from_user.id))
     await state.clear()
     if user_data is None:
         await state.set_state(RegisterUser.entering_age)
@@ -50,7 +59,12 @@ async def main():
     dp.include_router(menu.router)
     dp.include_router(travel.router)
     dp.include_router(main_router)
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        render_engine.shutdown()
+        await geocoder.close()
+        await close_sessions()
 
 
 if __name__ == "__main__":
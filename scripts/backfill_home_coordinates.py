@@ -0,0 +1,50 @@
+"""
+Fill home coordinates of users registered before they were stored.
+
+Every distinct (city, country) pair is geocoded once, then all users with it are updated in bulk.
+
+Usage: python -m scripts.backfill_home_coordinates
+"""
+import asyncio
+import logging
+
+from sqlalchemy import select, update
+
+from database.database_connector import session_maker
+from database.models import User
+from tools.geocoding import geocoder
+from tools.helpers import get_city
+
+# Nominatim usage policy allows at most one request per second
+GEOCODING_INTERVAL = 1
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    async with session_maker() as session:
+        places = (await session.execute(
+            select(User.city, User.country).distinct()
+            .where(User.home_latitude.is_(None), User.city.is_not(None), User.country.is_not(None))
+        )).all()
+        updated = 0
+        for city, country in places:
+            try:
+                city_info = await get_city(session, city, country)
+            except (IndexError, KeyError):
+                logging.warning("City %s, %s is not found", city, country)
+                continue
+            finally:
+                await asyncio.sleep(GEOCODING_INTERVAL)
+            result = await session.execute(
+                update(User)
+                .where(User.city == city, User.country == country, User.home_latitude.is_(None))
+                .values(home_latitude=float(city_info["lat"]), home_longitude=float(city_info["lon"]))
+            )
+            updated += result.rowcount
+        await session.commit()
+    await geocoder.close()
+    logging.info("Updated %d users from %d places", updated, len(places))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+Build the local gazetteer index from GeoNames dumps (https://download.geonames.org/export/dump/).
+
+Usage: python -m scripts.build_gazetteer cities15000.txt countryInfo.txt gazetteer.idx
+           [--alternate-names alternateNamesV2.txt] [--language ru] [--points reverse_geocoder.npz]
+
+Display names are taken from alternate names in the given language, so they match what Nominatim
+returns for accept-language=ru-ru. Without alternate names GeoNames names are used.
+With --points city centroids are also written as the offline reverse geocoding index.
+"""
+import argparse
+import csv
+import logging
+import sys
+
+from tools.gazetteer import build_gazetteer, COUNTRY, CITY
+from tools.reverse_geocoder import ReverseGeocoder
+
+csv.field_size_limit(sys.maxsize)
+
+
+def read_tsv(path: str):
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.reader(file, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row and not row[0].startswith("#"):
+                yield row
+
+
+def read_alternate_names(path: str, language: str, geoname_ids: set[str]) -> dict[str, list[str]]:
+    """
+    Names in the language for the given geonames, preferred and full names first
+    """
+    names = {}
+    for row in read_tsv(path):
+        geoname_id, isolanguage, name = row[1], row[2], row[3]
+        is_preferred, is_short, is_colloquial, is_historic = (row[i] == "1" for i in range(4, 8))
+        if isolanguage != language or geoname_id not in geoname_ids or is_colloquial or is_historic:
+            continue
+        names.setdefault(geoname_id, []).append((not is_preferred, is_short, name))
+    return {geoname_id: [name for *_, name in sorted(variants)] for geoname_id, variants in names.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cities")
+    parser.add_argument("countries")
+    parser.add_argument("output")
+    parser.add_argument("--alternate-names")
+    parser.add_argument("--language", default="ru")
+    parser.add_argument("--points")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    countries = {row[0]: (row[16], row[4]) for row in read_tsv(args.countries)}
+    cities = list(read_tsv(args.cities))
+    localized = {}
+    if args.alternate_names:
+        geoname_ids = {geoname_id for geoname_id, _ in countries.values()} | {row[0] for row in cities}
+        localized = read_alternate_names(args.alternate_names, args.language, geoname_ids)
+
+    records = []
+    points = []
+    country_names = {}
+    for code, (geoname_id, name) in countries.items():
+        names = localized.get(geoname_id, [])
+        country_names[code] = names[0] if names else name
+        for alias in [name, *names]:
+            records.append((alias, COUNTRY, country_names[code], country_names[code], "", "", 0))
+    for row in cities:
+        geoname_id, name, ascii_name, alternate_names, lat, lon, code = row[0], row[1], row[2], row[3], row[4], \
+            row[5], row[8]
+        if code not in country_names:
+            continue
+        names = localized.get(geoname_id, [])
+        display_name = names[0] if names else name
+        population = int(row[14] or 0)
+        # Sections of cities (PPLX) would answer with a district name instead of the city
+        if row[7] != "PPLX":
+            points.append((display_name, country_names[code], float(lat), float(lon)))
+        for alias in {name, ascii_name, *alternate_names.split(","), *names}:
+            records.append((alias, CITY, display_name, country_names[code], lat, lon, population))
+    count = build_gazetteer(records, args.output)
+    logging.info("Written %d names of %d countries and %d cities to %s", count, len(countries), len(cities),
+                 args.output)
+    if args.points:
+        ReverseGeocoder.build(points).save(args.points)
+        logging.info("Written %d city centroids to %s", len(points), args.points)
+
+
+if __name__ == "__main__":
+    main()
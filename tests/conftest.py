@@ -0,0 +1,64 @@
+import pytest
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+        self.ttl = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+        self.ttl[key] = ex
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.ttl.pop(key, None)
+
+    async def hgetall(self, key):
+        return {field.encode(): str(value).encode() for field, value in self.hashes.get(key, {}).items()}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.redis.data[key] = value.encode()
+        self.redis.ttl[key] = ex
+
+    def hincrby(self, key, field, amount):
+        fields = self.redis.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+
+    async def execute(self):
+        pass
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """
+    Replace the redis client of a module with an in-memory one: fake_redis(module) returns the fake
+    """
+    def patch(module) -> FakeRedis:
+        redis = FakeRedis()
+        monkeypatch.setattr(module, "redis", redis)
+        return redis
+
+    return patch
@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import config
+
+if config.database_url is None:
+    pytest.skip("POSTGRES_CONN is not set", allow_module_level=True)
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database_connector import engine
+from database.models import User, Travel, TravelLocation, TravelNote
+from handlers import travel as travel_handlers
+from tools import helpers
+from tools.markups import TravelListCallbackFactory, TravelCallbackFactory, TravelActions, \
+    TravelLocationCallbackFactory, TravelLocationActions, TravelNoteCallbackFactory, TravelNoteActions
+from translations import ACCESS_DENIED
+
+OWNER_ID = 9_000_000_001
+FRIEND_IDS = [9_000_000_002, 9_000_000_003, 9_000_000_004]
+
+
+async def seed(session: AsyncSession) -> dict:
+    owner = User(id=OWNER_ID, name="owner")
+    friends = [User(id=user_id, name=f"friend {user_id}") for user_id in FRIEND_IDS]
+    travel = Travel(title="loading profiles", owner=owner, access_users=friends)
+    travel.locations = [TravelLocation(city=f"city {i}", latitude="54.7", longitude="20.5",
+                                       start_date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i),
+                                       end_date=datetime.date(2024, 1, 2) + datetime.timedelta(days=i))
+                        for i in range(10)]
+    travel.notes = [TravelNote(file_id=f"file {i}", file_name=f"note {i}", is_public=True) for i in range(10)]
+    shared_travel = Travel(title="shared", owner=friends[0], access_users=[owner])
+    session.add_all([owner, *friends, travel, shared_travel])
+    await session.flush()
+    return {"travel": travel.id, "location": travel.locations[0].id, "note": travel.notes[0].id}
+
+
+class StubMessage:
+    """
+    Message of a callback, records what the handler sends
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def __getattr__(self, name):
+        async def send(*args, **kwargs):
+            self.sent.append(name)
+            return self
+
+        return send
+
+
+class StubCallback:
+    def __init__(self, user_id: int):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = StubMessage()
+        self.answers = []
+
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+
+# Screens run the real handlers as a user the travel is shared with. The helpers read relationships
+# through awaitable_attrs, so a relationship missing from the profile costs a statement
+async def travel_access(session: AsyncSession, ids: dict, callback: StubCallback):
+    await travel_handlers.handle_travel_callback(
+        callback, TravelCallbackFactory(action=TravelActions.SHOW_NOTES, travel_id=ids["travel"]), None, session)
+
+
+async def travel_info(session: AsyncSession, ids: dict, callback: StubCallback):
+    await travel_handlers.handle_travel_list_callback(callback, TravelListCallbackFactory(travel_id=ids["travel"]),
+                                                      session)
+
+
+async def location_info(session: AsyncSession, ids: dict, callback: StubCallback):
+    await travel_handlers.handle_travel_location_callback(
+        callback, TravelLocationCallbackFactory(action=TravelLocationActions.SHOW, location_id=ids["location"]),
+        session)
+
+
+async def note_info(session: AsyncSession, ids: dict, callback: StubCallback):
+    await travel_handlers.handle_travel_note_callback(
+        callback, TravelNoteCallbackFactory(action=TravelNoteActions.SHOW, note_id=ids["note"]), session)
+
+
+async def count_statements(screen, callback: StubCallback) -> tuple[int, int]:
+    """
+    :return: statements of the screen and lazy loads among them, which the profile of the screen should prevent
+    """
+    statements = []
+    lazy_loads = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    def count_lazy_load(orm_execute_state):
+        if orm_execute_state.lazy_loaded_from is not None:
+            lazy_loads.append(orm_execute_state.statement)
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            async with AsyncSession(connection) as session:
+                ids = await seed(session)
+            event.listen(engine.sync_engine, "before_cursor_execute", count)
+            try:
+                async with AsyncSession(connection) as session:
+                    event.listen(session.sync_session, "do_orm_execute", count_lazy_load)
+                    await screen(session, ids, callback)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", count)
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+    return len(statements), len(lazy_loads)
+
+
+@pytest.fixture(autouse=True)
+def sections(monkeypatch):
+    async def section(*args):
+        return "section"
+
+    async def send_trip_map(message, travel_model):
+        await message.answer_photo("map")
+
+    # Page sections and the trip map do not touch the database
+    for name in ("get_weather_for_dates", "get_interesting_places_response", "get_foods_response"):
+        monkeypatch.setattr(helpers, name, section)
+    monkeypatch.setattr(helpers, "send_trip_map", send_trip_map)
+
+
+@pytest.mark.parametrize("screen, max_statements, sent", [
+    # Travel with its owner, users it is shared with, the user and the note page with its count
+    (travel_access, 5, "edit_text"),
+    (travel_info, 3, "answer_photo"),
+    (location_info, 2, "edit_text"),
+    (note_info, 2, "answer_document"),
+])
+def test_screen_statements(screen, max_statements, sent):
+    callback = StubCallback(FRIEND_IDS[0])
+    statements, lazy_loads = asyncio.run(count_statements(screen, callback))
+    assert statements <= max_statements
+    assert lazy_loads == 0
+    assert ACCESS_DENIED not in callback.answers
+    assert sent in callback.message.sent
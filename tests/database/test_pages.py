@@ -0,0 +1,83 @@
+import asyncio
+import datetime
+
+import pytest
+
+import config
+
+if config.database_url is None:
+    pytest.skip("POSTGRES_CONN is not set", allow_module_level=True)
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database_connector import engine
+from database.models import User, Travel, TravelLocation, TravelNote
+from database.pages import get_travel_page, get_location_page, get_note_page
+
+OWNER_ID = 9_000_000_011
+FRIEND_ID = 9_000_000_012
+
+
+async def seed(session: AsyncSession) -> dict:
+    owner = User(id=OWNER_ID, name="owner")
+    friend = User(id=FRIEND_ID, name="friend")
+    travels = [Travel(title=f"travel {i}", owner=owner) for i in range(21)]
+    travels += [Travel(title=f"shared {i}", owner=friend, access_users=[owner]) for i in range(4)]
+    travel = travels[0]
+    start = datetime.date(2024, 1, 1)
+    travel.locations = [TravelLocation(city=f"city {i}", start_date=start + datetime.timedelta(days=12 - i),
+                                       end_date=start + datetime.timedelta(days=13 - i)) for i in range(12)]
+    travel.notes = [TravelNote(file_id=f"file {i}", file_name=f"note {i}", is_public=i % 2 == 0) for i in range(8)]
+    session.add_all([owner, friend, *travels])
+    await session.flush()
+    return {"travels": [travel.id for travel in travels], "travel": travel.id}
+
+
+async def run(get_page) -> tuple[list, int, int]:
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            async with AsyncSession(connection) as session:
+                ids = await seed(session)
+            event.listen(engine.sync_engine, "before_cursor_execute", count)
+            try:
+                async with AsyncSession(connection) as session:
+                    page, total = await get_page(session, ids)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", count)
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+    return [tuple(row) for row in page], total, len(statements)
+
+
+def test_travel_page():
+    page, total, statements = asyncio.run(run(lambda session, ids: get_travel_page(session, OWNER_ID, 20)))
+    assert total == 25
+    assert [title for _, title, _ in page] == ["travel 4", "travel 3", "travel 2", "travel 1", "travel 0"]
+    assert statements == 2
+
+
+def test_location_page():
+    page, total, statements = asyncio.run(run(lambda session, ids: get_location_page(session, ids["travel"], 10)))
+    assert total == 12
+    assert [city for _, city, _, _ in page] == ["city 1", "city 0"]
+    assert statements == 2
+
+
+@pytest.mark.parametrize("public_only, expected_total, expected_names", [
+    (False, 8, ["note 2", "note 1", "note 0"]),
+    (True, 4, []),
+])
+def test_note_page(public_only, expected_total, expected_names):
+    page, total, statements = asyncio.run(run(lambda session, ids: get_note_page(session, ids["travel"],
+                                                                                   public_only, 5)))
+    assert total == expected_total
+    assert [file_name for _, file_name in page] == expected_names
+    assert statements == 2
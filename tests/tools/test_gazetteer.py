@@ -0,0 +1,65 @@
+import pytest
+
+from tools.gazetteer import Gazetteer, build_gazetteer, COUNTRY, CITY
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = str(tmp_path / "gazetteer.idx")
+    build_gazetteer([
+        ("Russia", COUNTRY, "Россия", "Россия", "", "", 0),
+        ("Россия", COUNTRY, "Россия", "Россия", "", "", 0),
+        ("France", COUNTRY, "Франция", "Франция", "", "", 0),
+        ("Франция", COUNTRY, "Франция", "Франция", "", "", 0),
+        ("Moscow", CITY, "Москва", "Россия", "55.75222", "37.61556", 10381222),
+        ("Москва", CITY, "Москва", "Россия", "55.75222", "37.61556", 10381222),
+        ("Moskva", CITY, "Москва", "Россия", "55.75222", "37.61556", 10381222),
+        ("Paris", CITY, "Париж", "Франция", "48.85341", "2.3488", 2138551),
+        ("Париж", CITY, "Париж", "Франция", "48.85341", "2.3488", 2138551),
+        ("Орёл", CITY, "Орёл", "Россия", "52.96508", "36.07849", 317854),
+    ], path)
+    gazetteer = Gazetteer(path)
+    yield gazetteer
+    gazetteer.close()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Россия", "Россия"),
+    ("russia", "Россия"),
+    ("  ФРАНЦИЯ ", "Франция"),
+    ("Германия", None),
+])
+def test_get_country(gazetteer, text, expected):
+    assert gazetteer.get_country(text) == expected
+
+
+@pytest.mark.parametrize("text, country, expected", [
+    ("Москва", "Россия", "Москва"),
+    ("moscow", "Russia", "Москва"),
+    ("Орел", "Россия", "Орёл"),
+    ("Париж", "Россия", None),
+    ("Париж", None, "Париж"),
+])
+def test_get_city(gazetteer, text, country, expected):
+    city = gazetteer.get_city(text, country)
+    assert (city["name"] if city else None) == expected
+
+
+def test_get_city_and_country(gazetteer):
+    assert gazetteer.get_city_and_country("Париж, Франция") == {
+        "name": "Париж", "lat": "48.85341", "lon": "2.3488", "addresstype": CITY, "display_name": "Париж, Франция"
+    }
+
+
+def test_prefix(gazetteer):
+    assert {record["name"] for record in gazetteer.prefix("мо")} == {"Москва"}
+
+
+@pytest.mark.parametrize("text, kind, country, expected", [
+    ("Моссква", CITY, "Россия", ["Москва"]),
+    ("Парижж", CITY, None, ["Париж"]),
+    ("Росия", COUNTRY, None, ["Россия"]),
+    ("Лондон", CITY, None, []),
+])
+def test_suggest(gazetteer, text, kind, country, expected):
+    assert gazetteer.suggest(text, kind, country) == expected
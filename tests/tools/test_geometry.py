@@ -0,0 +1,62 @@
+import mercantile
+import numpy as np
+import pytest
+
+from tools.geometry import project_to_web_mercator, simplify_polyline, choose_zoom, count_tiles
+
+
+@pytest.mark.parametrize("lon, lat", [
+    (37.6156, 55.7522),
+    (2.3522, 48.8566),
+    (-74.0060, 40.7128),
+    (0, 0),
+])
+def test_project_to_web_mercator(lon, lat):
+    assert project_to_web_mercator([[lon, lat]])[0] == pytest.approx(mercantile.xy(lon, lat), abs=1e-6)
+
+
+def test_simplify_polyline_keeps_corners():
+    line = np.array([[0, 0], [1, 0.01], [2, 0], [3, 0.01], [4, 0], [4, 1], [4, 2]], dtype=float)
+    assert simplify_polyline(line, 0.1).tolist() == [[0, 0], [4, 0], [4, 2]]
+
+
+def distances_to_polyline(points: np.ndarray, polyline: np.ndarray) -> np.ndarray:
+    starts, ends = polyline[:-1], polyline[1:]
+    direction = ends - starts
+    offsets = points[:, None, :] - starts[None, :, :]
+    squared_length = np.maximum((direction ** 2).sum(axis=1), 1e-12)
+    t = np.clip((offsets * direction).sum(axis=2) / squared_length, 0, 1)
+    nearest = starts[None, :, :] + t[:, :, None] * direction[None, :, :]
+    return np.hypot(*(points[:, None, :] - nearest).transpose(2, 0, 1)).min(axis=1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_simplify_polyline_error_is_bounded(seed):
+    points = np.cumsum(np.random.default_rng(seed).normal(size=(2000, 2)), axis=0)
+    simplified = simplify_polyline(points, 2.0)
+    assert len(simplified) < len(points)
+    assert simplified[0].tolist() == points[0].tolist() and simplified[-1].tolist() == points[-1].tolist()
+    assert distances_to_polyline(points, simplified).max() <= 2.0
+
+
+@pytest.mark.parametrize("bbox", [
+    (30.3141, 55.7522, 37.6156, 59.9386),
+    (37.6000, 55.7500, 37.6200, 55.7600),
+    (2.3522, 48.8566, 13.4050, 52.5200),
+    (-170, -60, 170, 80),
+])
+def test_count_tiles_matches_mercantile(bbox):
+    for zoom in range(2, 12):
+        assert count_tiles(*bbox, zoom) == len(list(mercantile.tiles(*bbox, zoom)))
+
+
+@pytest.mark.parametrize("bbox, max_tiles", [
+    ((30.3141, 55.7522, 37.6156, 59.9386), 24),
+    ((30.3141, 55.7522, 37.6156, 59.9386), 4),
+    ((37.6156, 55.7522, 37.6156, 55.7522), 24),
+    ((-170, -60, 170, 80), 24),
+])
+def test_choose_zoom_respects_tile_budget(bbox, max_tiles):
+    zoom = choose_zoom(*bbox, target_size=1024, max_tiles=max_tiles, min_zoom=2, max_zoom=18)
+    assert 2 <= zoom <= 18
+    assert len(list(mercantile.tiles(*bbox, zoom))) <= max_tiles
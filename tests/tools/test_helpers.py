@@ -1,8 +1,22 @@
+import asyncio
+import datetime
+import logging
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
 
-from tools.helpers import get_country, get_city, get_city_and_country, get_location_info, get_profile_info, LocationInfo
+from database.database_connector import session_maker
+from tools import helpers
+from tools.helpers import get_country, get_city, get_city_and_country, get_location_info, get_profile_info, LocationInfo, \
+    get_section, send_trip_map
+
+
+async def with_session(func, *args):
+    async with session_maker() as db_session:
+        return await func(db_session, *args)
 
 
 @pytest.mark.parametrize("text, expected", [
@@ -12,7 +26,7 @@ from tools.helpers import get_country, get_city, get_city_and_country, get_locat
     ("США", "Соединённые Штаты Америки"),
 ])
 def test_get_country(text, expected):
-    assert get_country(text) == expected
+    assert asyncio.run(with_session(get_country, text)) == expected
 
 
 @pytest.mark.parametrize("text, country, expected", [
@@ -22,7 +36,7 @@ def test_get_country(text, expected):
     ("Нью-Йорк", "США", "Нью-Йорк"),
 ])
 def test_get_city(text, country, expected):
-    assert get_city(text, country)["name"] == expected
+    assert asyncio.run(with_session(get_city, text, country))["name"] == expected
 
 
 @pytest.mark.parametrize("text, expected", [
@@ -32,7 +46,7 @@ def test_get_city(text, country, expected):
     ("Нью-Йорк, США", "Нью-Йорк"),
 ])
 def test_get_city_and_country(text, expected):
-    assert get_city_and_country(text)["name"] == expected
+    assert asyncio.run(with_session(get_city_and_country, text))["name"] == expected
 
 
 @pytest.mark.parametrize("lat, lon, expected", [
@@ -58,7 +72,7 @@ def test_get_city_and_country(text, expected):
                         latitude=None, longitude=None, address=None)),
 ])
 def test_get_location_info(lat, lon, expected):
-    assert get_location_info(lat, lon) == expected
+    assert asyncio.run(with_session(get_location_info, lat, lon)) == expected
 
 
 def test_get_profile_info():
@@ -72,3 +86,85 @@ def test_get_profile_info():
                                       "Краткое описание: {bio}").format(name=user.name, age=user.age,
                                                                         country=user.country, city=user.city,
                                                                         bio=user.bio)
+
+
+def test_get_section(caplog):
+    async def slow():
+        await asyncio.sleep(1)
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    async def failing():
+        raise ValueError
+
+    async def run():
+        return await asyncio.gather(get_section("slow", slow(), 0.01, "-"), get_section("fast", fast(), 0.01, "-"),
+                                    get_section("failing", failing(), 0.01, "-"))
+
+    caplog.set_level(logging.INFO, logger="tools.helpers")
+    assert asyncio.run(run()) == ["-", "fast", "-"]
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Section slow timed out after 0.01 s" in messages
+    assert "Section failing failed" in messages
+    assert {message.split(" took ")[0] for message in messages if " took " in message} == \
+           {"Section slow", "Section fast", "Section failing"}
+
+
+class StubMessage:
+    """
+    Chat which knows the file ids of the photos uploaded to it
+    """
+
+    def __init__(self):
+        self.file_ids = set()
+        self.sent = []
+
+    async def answer_photo(self, photo):
+        if isinstance(photo, BufferedInputFile):
+            file_id = f"file {len(self.file_ids)}"
+            self.file_ids.add(file_id)
+            self.sent.append("upload")
+            return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+        if photo not in self.file_ids:
+            raise TelegramBadRequest(mock.Mock(), "wrong file identifier")
+        self.sent.append(photo)
+
+
+def trip(*coordinates) -> SimpleNamespace:
+    return SimpleNamespace(locations=[
+        SimpleNamespace(longitude=lon, latitude=lat, start_date=datetime.date(2024, 1, 1 + i))
+        for i, (lon, lat) in enumerate(coordinates)
+    ])
+
+
+def test_send_trip_map(monkeypatch, fake_redis):
+    renders = []
+
+    async def get_trip_map(travel_model):
+        renders.append(travel_model)
+        return b"png"
+
+    redis = fake_redis(helpers)
+    monkeypatch.setattr(helpers, "get_trip_map", get_trip_map)
+    message = StubMessage()
+    travel_model = trip(("37.6", "55.7"), ("30.3", "59.9"))
+    key = f"trip_map:{helpers.get_trip_map_key(travel_model)}"
+
+    async def run():
+        await send_trip_map(message, travel_model)
+        # The uploaded map is sent again by its file id
+        await send_trip_map(message, travel_model)
+        # A file id Telegram does not know any more is dropped and the map is uploaded again
+        redis.data[key] = b"file 9"
+        await send_trip_map(message, travel_model)
+        await send_trip_map(message, travel_model)
+        # Changed locations get a new map
+        await send_trip_map(message, trip(("37.6", "55.7"), ("20.5", "54.7")))
+
+    asyncio.run(run())
+    assert message.sent == ["upload", "file 0", "upload", "file 1", "upload"]
+    assert len(renders) == 3
+    assert redis.data[key] == b"file 1"
+    assert len(redis.data) == 2
@@ -0,0 +1,74 @@
+import asyncio
+
+import aiohttp
+
+from tools import places
+from tools.places import get_addresses, get_interesting_places, get_foods
+
+
+def place(xid: str) -> dict:
+    return {"properties": {"xid": xid, "name": xid}, "geometry": {"coordinates": [37.6176, 55.7558]}}
+
+
+def test_get_addresses(monkeypatch, fake_redis):
+    requested = []
+    details = {
+        "N1": {"address": {"house_number": "1", "road": "Красная площадь", "city": "Москва", "country": "Россия"}},
+        "N2": {"xid": "N2", "name": "N2"},
+    }
+
+    async def fetch_json(url):
+        requested.append(url)
+        return details[url.split("/")[-1].split("?")[0]]
+
+    fake_redis(places)
+    monkeypatch.setattr(places, "fetch_json", fetch_json)
+    first = asyncio.run(get_addresses([place("N1"), place("N2")]))
+    second = asyncio.run(get_addresses([place("N2"), place("N1")]))
+    assert first == ["1, Красная площадь, Москва, Россия", "55.755800, 37.617600"]
+    assert second == first[::-1]
+    assert len(requested) == 2
+
+
+def test_failed_details_are_not_cached(monkeypatch, fake_redis):
+    requested = []
+
+    async def fetch_json(url):
+        requested.append(url)
+        if "N1" in url:
+            raise aiohttp.ClientResponseError(None, (), status=429)
+        if "N2" in url:
+            return {"error": "Server error"}
+        return {"address": {"road": "Тверская улица", "city": "Москва"}}
+
+    redis = fake_redis(places)
+    monkeypatch.setattr(places, "fetch_json", fetch_json)
+    first = asyncio.run(get_addresses([place("N1"), place("N2"), place("N3")]))
+    second = asyncio.run(get_addresses([place("N1"), place("N2"), place("N3")]))
+    assert first == second == ["55.755800, 37.617600", "55.755800, 37.617600", "Тверская улица, Москва"]
+    assert list(redis.data) == ["place_address:N3"]
+    assert len(requested) == 5
+
+
+def test_places_of_both_kinds_are_fetched_once_per_cell(monkeypatch, fake_redis):
+    requested = []
+
+    async def fetch_json(url):
+        requested.append(url)
+        return {"type": "FeatureCollection", "features": [
+            {"properties": {"xid": "N1", "kinds": "cultural,museums,interesting_places"}},
+            {"properties": {"xid": "N2", "kinds": "foods,restaurants,tourist_facilities"}},
+        ]}
+
+    async def run():
+        return (await get_interesting_places(55.7558, 37.6176), await get_foods(55.7560, 37.6180),
+                await get_foods(55.7558, 37.6176))
+
+    fake_redis(places)
+    monkeypatch.setattr(places, "fetch_json", fetch_json)
+    interesting_places, foods, same_foods = asyncio.run(run())
+    assert [place["properties"]["xid"] for place in interesting_places["features"]] == ["N1"]
+    assert [place["properties"]["xid"] for place in foods["features"]] == ["N2"]
+    assert same_foods == foods
+    assert len(requested) == 1
+    assert "kinds=interesting_places,foods" in requested[0]
@@ -0,0 +1,33 @@
+import asyncio
+
+import mercantile
+
+from tools.render_engine import RenderEngine
+from tools.tile_cache import get_surface_cache
+
+
+def look_up_tile():
+    return get_surface_cache().get(mercantile.Tile(0, 0, 1))
+
+
+def test_inline_render_reports_surface_cache():
+    engine = RenderEngine(pool_size=0, queue_size=1)
+    misses = get_surface_cache().misses
+    assert asyncio.run(engine.render(look_up_tile)) is None
+    stats = engine.stats()
+    assert stats["completed"] == 0
+    assert stats["surface_cache"]["workers"] == 1
+    assert stats["surface_cache"]["misses"] == misses + 1
+
+
+def test_pool_render_collects_worker_surface_cache():
+    engine = RenderEngine(pool_size=1, queue_size=1)
+    try:
+        assert asyncio.run(engine.render(sum, [1, 2])) == 3
+        stats = engine.stats()
+    finally:
+        engine.shutdown()
+    assert stats["completed"] == 1
+    assert stats["surface_cache"]["workers"] == 1
+    assert stats["surface_cache"]["max_bytes"] == get_surface_cache().max_bytes
+    assert stats["surface_cache"]["hits"] == 0
@@ -0,0 +1,37 @@
+import pytest
+
+from tools.reverse_geocoder import ReverseGeocoder
+
+
+@pytest.fixture
+def reverse_geocoder(tmp_path):
+    path = str(tmp_path / "reverse_geocoder.npz")
+    ReverseGeocoder.build([
+        ("Москва", "Россия", 55.75222, 37.61556),
+        ("Химки", "Россия", 55.89704, 37.42969),
+        ("Париж", "Франция", 48.85341, 2.3488),
+        ("Калининград", "Россия", 54.70649, 20.51095),
+    ]).save(path)
+    return ReverseGeocoder.load(path)
+
+
+@pytest.mark.parametrize("lat, lon, expected", [
+    (55.7539, 37.6208, ("Москва", "Россия")),
+    (55.88, 37.44, ("Химки", "Россия")),
+    (48.8584, 2.2945, ("Париж", "Франция")),
+    # Next to a geohash cell border
+    (54.65, 20.51, ("Калининград", "Россия")),
+    (0.0, 0.0, None),
+    (52.0, 30.0, None),
+])
+def test_nearest(reverse_geocoder, lat, lon, expected):
+    assert reverse_geocoder.nearest(lat, lon, 30) == expected
+
+
+def test_nearest_looks_beyond_the_next_cells():
+    # The point is next to the north-west corner of its cell, the city in the north is two cells away
+    reverse_geocoder = ReverseGeocoder.build([
+        ("Север", "Россия", 55.895 + 21 / 111.19, 37.27),
+        ("Восток", "Россия", 55.895, 37.27 + 26 / 62.3),
+    ])
+    assert reverse_geocoder.nearest(55.895, 37.27, 30) == ("Север", "Россия")
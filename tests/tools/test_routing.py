@@ -0,0 +1,46 @@
+import asyncio
+
+from aiohttp import web
+
+import config
+from tools import routing
+from tools.http_sessions import close_sessions
+from tools.routing import decode_polyline, get_route
+
+
+def test_decode_polyline():
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+
+
+def test_get_route_requests_only_new_legs(monkeypatch, fake_redis):
+    requested = []
+    legs = {
+        "0.000000,0.000000;1.000000,1.000000": "??_ibE_ibE",
+        "1.000000,1.000000;2.000000,2.000000": "_ibE_ibE_ibE_ibE",
+    }
+
+    async def route(request):
+        requested.append(request.match_info["coordinates"])
+        return web.json_response({"routes": [{"geometry": legs[request.match_info["coordinates"]]}]})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/route/v1/driving/{coordinates}", route)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        monkeypatch.setattr(config, "osrm_url", f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}")
+        try:
+            first = await get_route([(0, 0), (1, 1)])
+            second = await get_route([(0, 0), (1, 1), (2, 2)])
+        finally:
+            await close_sessions()
+            await runner.cleanup()
+        return first, second
+
+    fake_redis(routing)
+    first, second = asyncio.run(run())
+    assert first == [[0, 0], [1, 1]]
+    assert second == [[0, 0], [1, 1], [2, 2]]
+    assert requested == list(legs)
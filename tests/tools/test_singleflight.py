@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from tools.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        single_flight = SingleFlight("test")
+        results = await asyncio.gather(*[single_flight.do(key, fetch, key) for key in ["a", "a", "b", "a"]])
+        # Finished calls are not reused
+        results.append(await single_flight.do("a", fetch, "a"))
+        return results, single_flight.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["A", "A", "B", "A", "A"]
+    assert calls == ["a", "b", "a"]
+    assert stats == {"in_flight": 0, "calls": 3, "coalesced": 2}
+
+
+def test_error_is_shared_and_cancelled_caller_does_not_cancel_call():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError
+
+    async def run():
+        single_flight = SingleFlight("test")
+        first = asyncio.ensure_future(single_flight.do("key", fail))
+        second = asyncio.ensure_future(single_flight.do("key", fail))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(ValueError):
+            await second
+
+    asyncio.run(run())
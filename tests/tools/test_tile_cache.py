@@ -0,0 +1,65 @@
+import asyncio
+
+import mercantile
+
+from tools.tile_cache import TileCache, SurfaceCache
+
+
+class FakeSurface:
+    def __init__(self, height):
+        self.height = height
+
+    def get_stride(self):
+        return 1024
+
+    def get_height(self):
+        return self.height
+
+
+def test_tile_cache_evicts_least_recently_used(tmp_path):
+    async def run():
+        cache = TileCache(str(tmp_path / "tiles.mbtiles"), max_bytes=1000, ttl=60)
+        tiles = [mercantile.Tile(x, 1, 3) for x in range(5)]
+        await cache.put_many({tile: b"x" * 300 for tile in tiles[:3]})
+        assert await cache.get_many([tiles[0]]) == {tiles[0]: b"x" * 300}
+        await cache.put_many({tiles[3]: b"y" * 300, tiles[4]: b"z" * 300})
+        assert cache.size <= 1000
+        assert set(await cache.get_many(tiles)) == {tiles[0], tiles[3], tiles[4]}
+
+    asyncio.run(run())
+
+
+def test_tile_cache_skips_expired_tiles(tmp_path):
+    async def run():
+        cache = TileCache(str(tmp_path / "tiles.mbtiles"), max_bytes=1000, ttl=0)
+        tile = mercantile.Tile(1, 1, 3)
+        await cache.put_many({tile: b"x"})
+        assert await cache.get_many([tile]) == {}
+
+    asyncio.run(run())
+
+
+def test_tile_cache_eviction_counts_tiles_of_other_processes(tmp_path):
+    async def run():
+        path = str(tmp_path / "tiles.mbtiles")
+        first = TileCache(path, max_bytes=1000, ttl=60)
+        second = TileCache(path, max_bytes=1000, ttl=60)
+        tiles = [mercantile.Tile(x, 1, 3) for x in range(4)]
+        await first.put_many({tile: b"x" * 300 for tile in tiles[:3]})
+        await second.put_many({tiles[3]: b"y" * 300})
+        assert second.size <= 1000
+        assert set(await first.get_many(tiles)) == {tiles[1], tiles[2], tiles[3]}
+
+    asyncio.run(run())
+
+
+def test_surface_cache_is_bounded_by_pixel_bytes():
+    cache = SurfaceCache(max_bytes=1024 * 10)
+    tiles = [mercantile.Tile(x, 1, 3) for x in range(3)]
+    cache.put(tiles[0], FakeSurface(4))
+    cache.put(tiles[1], FakeSurface(4))
+    assert cache.get(tiles[0]) is not None
+    cache.put(tiles[2], FakeSurface(4))
+    assert cache.get(tiles[1]) is None
+    assert cache.stats() == {"entries": 2, "bytes": 1024 * 8, "max_bytes": 1024 * 10, "hits": 1, "misses": 1,
+                             "evictions": 1}
@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+
+import pytest
+from aiohttp import web
+
+from tools import weather
+from tools.http_sessions import close_sessions
+from tools.weather import get_weather_for_dates, get_weather_cache_stats
+
+
+@pytest.fixture(autouse=True)
+def redis(fake_redis):
+    return fake_redis(weather)
+
+
+def day(date: datetime.date) -> dict:
+    return {"date": date.strftime('%Y-%m-%d'), "day": {"condition": {"text": "Ясно"}, "avgtemp_c": date.day}}
+
+
+def test_get_weather_for_dates(monkeypatch):
+    now = datetime.datetime.now().date()
+    requests = []
+
+    async def fetch_weather(endpoint, lat, lon, params):
+        requests.append((endpoint, params))
+        if endpoint == "forecast":
+            return {"forecast": {"forecastday": [day(now + datetime.timedelta(days=i)) for i in range(params["days"])]}}
+        return {"forecast": {"forecastday": [day(datetime.date.fromisoformat(params["dt"]))]}}
+
+    monkeypatch.setattr(weather, "fetch_weather", fetch_weather)
+    dates = [now + datetime.timedelta(days=i) for i in range(-2, 3)]
+    result = asyncio.run(get_weather_for_dates(dates[0], dates[-1] + datetime.timedelta(days=10), 55.75, 37.61))
+    assert result == "\n".join(f"{date.strftime('%d.%m.%Y')}: Ясно, {date.day}°C" for date in dates)
+    assert sorted(endpoint for endpoint, _ in requests) == ["forecast", "history", "history"]
+    assert ("forecast", {"days": 3}) in requests
+
+
+def test_get_weather_for_dates_stops_at_missing_day(monkeypatch):
+    now = datetime.datetime.now().date()
+
+    async def fetch_weather(endpoint, lat, lon, params):
+        if params["dt"] == (now + datetime.timedelta(days=21)).strftime('%Y-%m-%d'):
+            return {"error": {"code": 1006}}
+        return {"forecast": {"forecastday": [day(datetime.date.fromisoformat(params["dt"]))]}}
+
+    monkeypatch.setattr(weather, "fetch_weather", fetch_weather)
+    start = now + datetime.timedelta(days=20)
+    result = asyncio.run(get_weather_for_dates(start, start + datetime.timedelta(days=3), 55.75, 37.61))
+    assert result == f"{start.strftime('%d.%m.%Y')}: Ясно, {start.day}°C"
+
+
+def test_get_weather_for_dates_is_cached(monkeypatch, redis):
+    now = datetime.datetime.now().date()
+    requests = []
+
+    async def fetch_weather(endpoint, lat, lon, params):
+        requests.append(endpoint)
+        if endpoint == "forecast":
+            return {"forecast": {"forecastday": [day(now + datetime.timedelta(days=i)) for i in range(params["days"])]}}
+        return {"forecast": {"forecastday": [day(datetime.date.fromisoformat(params["dt"]))]}}
+
+    monkeypatch.setattr(weather, "fetch_weather", fetch_weather)
+    start = now - datetime.timedelta(days=1)
+    first = asyncio.run(get_weather_for_dates(start, now, 55.7512, 37.6184))
+    second = asyncio.run(get_weather_for_dates(start, now, 55.7498, 37.6201))
+    assert first == second
+    assert sorted(requests) == ["forecast", "history"]
+    assert redis.ttl[f"weather:55.75,37.62:{start.strftime('%Y-%m-%d')}"] == weather.config.weather_history_cache_ttl
+    assert redis.ttl[f"weather:55.75,37.62:{now.strftime('%Y-%m-%d')}"] == weather.config.weather_forecast_cache_ttl
+    assert asyncio.run(get_weather_cache_stats()) == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+
+
+def test_cancelled_caller_does_not_break_coalesced_request(monkeypatch):
+    now = datetime.datetime.now().date()
+    requests = []
+
+    async def forecast(request):
+        requests.append(request.match_info["endpoint"])
+        await asyncio.sleep(0.2)
+        return web.json_response({"forecast": {"forecastday": [day(now)]}})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/v1/{endpoint}.json", forecast)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(weather, "WEATHER_URL", f"http://127.0.0.1:{port}/v1/{{endpoint}}.json")
+        monkeypatch.setattr(weather.config, "weather_api_token", "token")
+        try:
+            # The first page times out like a section of the location page, the second one joins its request
+            first = asyncio.ensure_future(asyncio.wait_for(get_weather_for_dates(now, now, 55.75, 37.61), 0.05))
+            await asyncio.sleep(0.01)
+            second = await get_weather_for_dates(now, now, 55.75, 37.61)
+            with pytest.raises(asyncio.TimeoutError):
+                await first
+        finally:
+            await close_sessions()
+            await runner.cleanup()
+        return second
+
+    assert asyncio.run(run()) == f"{now.strftime('%d.%m.%Y')}: Ясно, {now.day}°C"
+    assert requests == ["forecast"]
+
+
+def test_forecast_days_do_not_exceed_the_limit(monkeypatch):
+    now = datetime.datetime.now().date()
+    requests = []
+
+    async def fetch_weather(endpoint, lat, lon, params):
+        requests.append((endpoint, params))
+        if "days" in params:
+            assert params["days"] <= weather.FORECAST_DAYS
+            return {"forecast": {"forecastday": [day(now + datetime.timedelta(days=i)) for i in range(params["days"])]}}
+        return {"forecast": {"forecastday": [day(datetime.date.fromisoformat(params["dt"]))]}}
+
+    monkeypatch.setattr(weather, "fetch_weather", fetch_weather)
+    dates = [now + datetime.timedelta(days=i) for i in range(12, 17)]
+    result = asyncio.run(get_weather_for_dates(dates[0], dates[-1], 55.75, 37.61))
+    assert result == "\n".join(f"{date.strftime('%d.%m.%Y')}: Ясно, {date.day}°C" for date in dates)
+    assert sorted(requests, key=str) == [
+        ("forecast", {"days": 14}),
+        ("forecast", {"dt": dates[2].strftime('%Y-%m-%d')}),
+        ("future", {"dt": dates[3].strftime('%Y-%m-%d')}),
+        ("future", {"dt": dates[4].strftime('%Y-%m-%d')}),
+    ]
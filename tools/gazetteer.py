@@ -0,0 +1,171 @@
+import difflib
+import mmap
+import struct
+import unicodedata
+from typing import Iterable, Optional
+
+import config
+
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4sxxxxQ")
+OFFSET = struct.Struct("<Q")
+COUNTRY = "country"
+CITY = "city"
+
+
+def normalize_name(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold().replace("ё", "е")
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+class Gazetteer:
+    """
+    Memory-mapped index of country and city names built by scripts/build_gazetteer.py.
+
+    The file is a header, a table of record offsets and records sorted by normalized name,
+    so exact and prefix lookups are binary searches over the mapped file.
+    Record is a line "key\\tkind\\tname\\tcountry\\tlat\\tlon\\tpopulation".
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer index")
+        self._offsets = memoryview(self._map)[HEADER.size:HEADER.size + OFFSET.size * self.count].cast("Q")
+
+    def _key(self, index: int) -> bytes:
+        start = self._offsets[index]
+        return self._map[start:self._map.find(b"\t", start)]
+
+    def _record(self, index: int) -> dict:
+        start = self._offsets[index]
+        line = self._map[start:self._map.find(b"\n", start)].decode()
+        key, kind, name, country, lat, lon, population = line.split("\t")
+        return {"key": key, "kind": kind, "name": name, "country": country, "lat": lat, "lon": lon,
+                "population": int(population)}
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, name: str, kind: Optional[str] = None) -> list[dict]:
+        """
+        Records with exactly this normalized name, most populated first
+        """
+        key = normalize_name(name).encode()
+        records = []
+        index = self._lower_bound(key)
+        while index < self.count and self._key(index) == key:
+            record = self._record(index)
+            if kind is None or record["kind"] == kind:
+                records.append(record)
+            index += 1
+        return records
+
+    def prefix(self, prefix: str, limit: int = 1000) -> Iterable[dict]:
+        """
+        Records whose normalized name starts with the prefix, in name order
+        """
+        key = normalize_name(prefix).encode()
+        index = self._lower_bound(key)
+        while index < self.count and limit > 0 and self._key(index).startswith(key):
+            yield self._record(index)
+            index += 1
+            limit -= 1
+
+    def get_country(self, text: str) -> Optional[str]:
+        countries = self.find(text, COUNTRY)
+        return countries[0]["name"] if countries else None
+
+    def get_city(self, text: str, country: Optional[str] = None) -> Optional[dict]:
+        """
+        Find city by name
+        :param text: city name
+        :param country: any known name of the country to search in
+        :return: dict with the same keys handlers use from Nominatim results
+        """
+        cities = self.find(text, CITY)
+        if country is not None:
+            countries = {record["name"] for record in self.find(country, COUNTRY)} | {country}
+            cities = [city for city in cities if city["country"] in countries]
+        if not cities:
+            return None
+        city = cities[0]
+        return {"name": city["name"], "lat": city["lat"], "lon": city["lon"], "addresstype": CITY,
+                "display_name": f"{city['name']}, {city['country']}"}
+
+    def get_city_and_country(self, text: str) -> Optional[dict]:
+        city, _, country = text.partition(",")
+        return self.get_city(city, country.strip() or None)
+
+    def suggest(self, text: str, kind: str, country: Optional[str] = None, limit: int = 3) -> list[str]:
+        """
+        Close matches for a misspelled name among names sharing its first letters
+        """
+        key = normalize_name(text)
+        if not key:
+            return []
+        countries = None
+        if country is not None:
+            countries = {record["name"] for record in self.find(country, COUNTRY)} | {country}
+        candidates = {}
+        for record in self.prefix(key[:2], limit=5000):
+            if record["kind"] != kind or (countries is not None and record["country"] not in countries):
+                continue
+            if record["key"] not in candidates or candidates[record["key"]]["population"] < record["population"]:
+                candidates[record["key"]] = record
+        matches = difflib.get_close_matches(key, list(candidates), n=limit * 3, cutoff=0.75)
+        names = []
+        for match in matches:
+            name = candidates[match]["name"]
+            if name not in names:
+                names.append(name)
+        return names[:limit]
+
+    def close(self) -> None:
+        self._offsets.release()
+        self._map.close()
+
+
+def build_gazetteer(records: Iterable[tuple[str, str, str, str, str, str, int]], path: str) -> int:
+    """
+    Write index file
+    :param records: (name, kind, display name, country, lat, lon, population), one per searchable name
+    :param path: output path
+    :return: number of records written
+    """
+    lines = sorted({(normalize_name(name), kind, display_name, country, lat, lon, population)
+                    for name, kind, display_name, country, lat, lon, population in records
+                    if normalize_name(name)},
+                   key=lambda line: (line[0].encode(), -line[6], line[2]))
+    data = [("\t".join(map(str, line)) + "\n").encode() for line in lines]
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(data)))
+        offset = HEADER.size + OFFSET.size * len(data)
+        for line in data:
+            file.write(OFFSET.pack(offset))
+            offset += len(line)
+        for line in data:
+            file.write(line)
+    return len(data)
+
+
+gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    Local gazetteer if GAZETTEER_PATH is configured
+    """
+    global gazetteer
+    if gazetteer is None and config.gazetteer_path:
+        gazetteer = Gazetteer(config.gazetteer_path)
+    return gazetteer
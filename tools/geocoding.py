@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+from typing import Optional
+
+import aiohttp
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from database.models import GeocodeCache
+from tools.singleflight import SingleFlight
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.casefold().replace(",", " ").split())
+
+
+def quantize(lat: float, lon: float) -> tuple[float, float]:
+    return round(float(lat), config.geocode_cache_precision), round(float(lon), config.geocode_cache_precision)
+
+
+async def get_cached(db_session: AsyncSession, kind: str, key: str):
+    """
+    Get cached geocoding response
+    :param db_session: session of the update, so the lookup does not take a second pooled connection
+    :return: response or None if it is not cached or expired, empty response means "not found"
+    """
+    return await db_session.scalar(
+        select(GeocodeCache.response)
+        .where(GeocodeCache.kind == kind, GeocodeCache.key == key,
+               GeocodeCache.expires_at > datetime.datetime.utcnow())
+    )
+
+
+async def set_cached(db_session: AsyncSession, kind: str, key: str, response) -> None:
+    """
+    Cache geocoding response in the transaction of the update, it is committed with the update
+    """
+    ttl = config.geocode_cache_ttl if response else config.geocode_cache_negative_ttl
+    expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=ttl)
+    await db_session.execute(
+        insert(GeocodeCache)
+        .values(kind=kind, key=key, response=response, expires_at=expires_at)
+        .on_conflict_do_update(index_elements=[GeocodeCache.kind, GeocodeCache.key],
+                               set_={"response": response, "expires_at": expires_at})
+    )
+
+
+class NominatimClient:
+    """
+    Asyncio Nominatim client returning the same raw payloads as geopy
+    """
+
+    def __init__(self, url: str, user_agent: str, timeout: float, language: str = "ru-ru"):
+        self.url = url.rstrip("/")
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.language = language
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._searches = SingleFlight("geocode")
+        self._reverses = SingleFlight("reverse")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(headers={"User-Agent": self.user_agent},
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._loop = loop
+        return self._session
+
+    async def _get(self, path: str, params: dict):
+        params = {"format": "json", "accept-language": self.language, **params}
+        async with self._get_session().get(f"{self.url}/{path}", params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def geocode(self, db_session: AsyncSession, query: str) -> list[dict]:
+        """
+        Forward geocoding, cached by normalized query. The cache is read and written in the session of every
+        caller, only the Nominatim request is shared by concurrent callers
+        :param db_session: session of the update
+        :param query: free-form query
+        :return: raw results, empty if nothing is found
+        """
+        key = normalize_query(query)
+        result = await get_cached(db_session, "search", key)
+        if result is None:
+            result = await self._searches.do(key, self._geocode, query, distributed=config.singleflight_distributed)
+            await set_cached(db_session, "search", key, result)
+        return result
+
+    async def _geocode(self, query: str) -> list[dict]:
+        return await self._get("search", {"q": query}) or []
+
+    async def reverse(self, db_session: AsyncSession, lat: float, lon: float) -> dict:
+        """
+        Reverse geocoding, cached by coordinates rounded to GEOCODE_CACHE_PRECISION digits
+        :param db_session: session of the update
+        :return: raw result, empty if nothing is found
+        """
+        lat, lon = quantize(lat, lon)
+        key = f"{lat},{lon}"
+        result = await get_cached(db_session, "reverse", key)
+        if result is None:
+            result = await self._reverses.do(key, self._reverse, lat, lon, distributed=config.singleflight_distributed)
+            await set_cached(db_session, "reverse", key, result)
+        return result
+
+    async def _reverse(self, lat: float, lon: float) -> dict:
+        result = await self._get("reverse", {"lat": lat, "lon": lon, "addressdetails": 1})
+        return {} if "error" in result else result
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+geocoder = NominatimClient(config.nominatim_url, config.nominatim_user_agent, config.nominatim_timeout)
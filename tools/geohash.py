@@ -0,0 +1,77 @@
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+DECODE_MAP = {c: i for i, c in enumerate(BASE32)}
+
+
+def encode(lat: float, lon: float, precision: int) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    result = []
+    bit = 0
+    value = 0
+    even = True
+    while len(result) < precision:
+        coordinate_range, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (coordinate_range[0] + coordinate_range[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            coordinate_range[0] = middle
+        else:
+            coordinate_range[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            result.append(BASE32[value])
+            bit = 0
+            value = 0
+    return "".join(result)
+
+
+def decode_bounds(geohash: str) -> tuple[float, float, float, float]:
+    """
+    :return: south, west, north, east of the cell
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for c in geohash:
+        value = DECODE_MAP[c]
+        for shift in range(4, -1, -1):
+            coordinate_range = lon_range if even else lat_range
+            middle = (coordinate_range[0] + coordinate_range[1]) / 2
+            if value >> shift & 1:
+                coordinate_range[0] = middle
+            else:
+                coordinate_range[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash: str) -> tuple[float, float]:
+    """
+    :return: lat, lon of the cell center
+    """
+    south, west, north, east = decode_bounds(geohash)
+    return (south + north) / 2, (west + east) / 2
+
+
+def neighbours(geohash: str, lat_rings: int = 1, lon_rings: int = 1) -> list[str]:
+    """
+    :param lat_rings: number of cells to take to the north and to the south
+    :param lon_rings: number of cells to take to the west and to the east
+    :return: the cell and the cells around it
+    """
+    south, west, north, east = decode_bounds(geohash)
+    lat, lon = (south + north) / 2, (west + east) / 2
+    height, width = north - south, east - west
+    # Rings wider than the globe would repeat the same cells
+    lon_rings = min(lon_rings, int(360 / width) // 2)
+    cells = {}
+    for dlat in range(-lat_rings, lat_rings + 1):
+        for dlon in range(-lon_rings, lon_rings + 1):
+            neighbour_lat = lat + dlat * height
+            if not -90 < neighbour_lat < 90:
+                continue
+            neighbour_lon = (lon + dlon * width + 180) % 360 - 180
+            cells.setdefault(encode(neighbour_lat, neighbour_lon, len(geohash)))
+    return list(cells)
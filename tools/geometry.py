@@ -0,0 +1,114 @@
+import itertools
+import math
+
+import mercantile
+import numpy as np
+
+EARTH_RADIUS = 6378137.0
+TILE_SIZE = 256
+MAX_LATITUDE = 85.051129
+LL_EPSILON = 1e-11
+
+
+def project_to_web_mercator(coordinates) -> np.ndarray:
+    """
+    Project (lon, lat) points to Web Mercator in one vectorized step, same as mercantile.xy for each point
+    :param coordinates: sequence of (lon, lat)
+    :return: array of shape (n, 2) with x, y in meters
+    """
+    if isinstance(coordinates, np.ndarray):
+        lnglat = coordinates.astype(np.float64).reshape(-1, 2)
+    else:
+        # Flattening is several times faster than np.asarray for a list of [lon, lat] lists from OSRM JSON
+        lnglat = np.fromiter(itertools.chain.from_iterable(coordinates), dtype=np.float64,
+                             count=2 * len(coordinates)).reshape(-1, 2)
+    projected = np.empty_like(lnglat)
+    projected[:, 0] = EARTH_RADIUS * np.radians(lnglat[:, 0])
+    with np.errstate(divide="ignore"):
+        projected[:, 1] = EARTH_RADIUS * np.log(np.tan(math.pi / 4 + np.radians(lnglat[:, 1]) / 2))
+    return projected
+
+
+def meters_per_pixel(zoom: int) -> float:
+    return 2 * math.pi * EARTH_RADIUS / (TILE_SIZE * 2 ** zoom)
+
+
+def count_tiles(west, south, east, north, zoom: int) -> int:
+    """
+    Number of tiles mercantile.tiles yields for the bbox, without materializing them
+    """
+    north = min(north, MAX_LATITUDE)
+    south = max(south, -MAX_LATITUDE)
+    left_top = mercantile.tile(west, north, zoom)
+    right_bottom = mercantile.tile(east - LL_EPSILON, south + LL_EPSILON, zoom)
+    return (right_bottom.x - left_top.x + 1) * (right_bottom.y - left_top.y + 1)
+
+
+def choose_zoom(west, south, east, north, target_size: int, max_tiles: int, min_zoom: int, max_zoom: int) -> int:
+    """
+    Pick the zoom at which the bbox spans about target_size pixels on its longer side,
+    lowered until the map needs at most max_tiles tiles
+    :return: zoom between min_zoom and max_zoom
+    """
+    left, top = mercantile.xy(west, min(north, MAX_LATITUDE))
+    right, bottom = mercantile.xy(east, max(south, -MAX_LATITUDE))
+    span = max(right - left, top - bottom)
+    if span <= 0:
+        zoom = max_zoom
+    else:
+        zoom = math.floor(math.log2(target_size * meters_per_pixel(0) / span))
+    zoom = min(max(zoom, min_zoom), max_zoom)
+    while zoom > min_zoom and count_tiles(west, south, east, north, zoom) > max_tiles:
+        zoom -= 1
+    return zoom
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Grid deduplication followed by Douglas-Peucker simplification
+    :param points: array of shape (n, 2)
+    :param tolerance: max distance between the simplified and original polyline, in units of points
+    :return: array with the kept points, first and last points are always kept
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    # Points that fall into the same cell as their predecessor can not change the picture, dropping them first
+    # leaves Douglas-Peucker only a few points per visible pixel. A dropped point is within the cell diagonal,
+    # half the tolerance, of a kept one, so Douglas-Peucker gets the other half
+    cells = np.floor(points / (tolerance / (2 * math.sqrt(2))))
+    tolerance /= 2
+    distinct = np.ones(len(points), dtype=bool)
+    distinct[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    distinct[-1] = True
+    points = points[distinct]
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    # Segments known to be within tolerance, indexed by their start point
+    settled = np.zeros(len(points), dtype=bool)
+    # Every pass splits all unsettled segments at once, so the number of passes is the recursion depth
+    while True:
+        kept = np.flatnonzero(keep)
+        starts, ends = kept[:-1], kept[1:]
+        active = (ends - starts > 1) & ~settled[starts]
+        starts, ends = starts[active], ends[active]
+        if not len(starts):
+            break
+        lengths = ends - starts - 1
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        inner_index = np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(starts + 1, lengths)
+        start_points = points[starts][segment]
+        direction = points[ends][segment] - start_points
+        inner = points[inner_index] - start_points
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        cross = np.abs(direction[:, 0] * inner[:, 1] - direction[:, 1] * inner[:, 0])
+        distances = np.where(length > 0, cross / np.where(length > 0, length, 1), np.hypot(inner[:, 0], inner[:, 1]))
+        max_distances = np.maximum.reduceat(distances, offsets)
+        farthest = np.flatnonzero(distances == np.repeat(max_distances, lengths))
+        farthest = farthest[np.r_[True, segment[farthest][1:] != segment[farthest][:-1]]]
+        split = max_distances > tolerance
+        keep[inner_index[farthest[split]]] = True
+        settled[starts[~split]] = True
+    return points[keep]
@@ -1,44 +1,88 @@
+import asyncio
+import logging
+import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Awaitable, Optional
 
 from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import BufferedInputFile
-from geopy.geocoders import Nominatim
 from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import config
 from database.models import User, Travel, TravelLocation, TravelNote
-from tools.map_draw import get_trip_map
+from database.pages import PAGE_SIZE, get_travel_page, get_location_page, get_note_page
+from database.redis_connector import redis
+from tools.gazetteer import get_gazetteer, COUNTRY, CITY
+from tools.geocoding import geocoder
+from tools.map_draw import get_trip_map, get_trip_map_key
 from tools.markups import get_menu_keyboard_markup, get_travel_info_keyboard_markup, get_travel_list_keyboard_markup, \
     get_travel_locations_list_keyboard_markup, get_travel_location_info_keyboard_markup, \
     get_travel_notes_list_keyboard_markup, get_travel_note_info_keyboard_markup
 from tools.places import get_interesting_places_response, get_foods_response
+from tools.reverse_geocoder import get_reverse_geocoder
+from tools.singleflight import SingleFlight
 from tools.weather import get_weather_for_dates
 from translations import COUNTRY_AND_CITY_RESPONSE, PROFILE_INFO, MENU_TEXT, TRAVEL_INFO, TRAVEL_INFO_DESCRIPTION, \
-    TRAVEL_LIST_PAGE, ACCESS_DENIED, TRAVEL_LOCATION_INFO, TRAVEL_INFO_USERS
+    TRAVEL_LIST_PAGE, ACCESS_DENIED, TRAVEL_LOCATION_INFO, TRAVEL_INFO_USERS, INCORRECT_COUNTRY, INCORRECT_CITY, \
+    INCORRECT_COUNTRY_SUGGESTIONS, INCORRECT_CITY_SUGGESTIONS, WEATHER_UNAVAILABLE, PLACES_UNAVAILABLE
 
-geolocator = Nominatim(user_agent="some_user_agent")
+logger = logging.getLogger(__name__)
+trip_maps_in_flight = SingleFlight("trip_map")
 
 
 def object_as_dict(obj):
+    # Unloaded relationships are skipped, as loading them needs await
+    state = inspect(obj)
     return {
         c.key: getattr(obj, c.key)
-        for c in inspect(obj).mapper.column_attrs + inspect(obj).mapper.relationships
+        for c in state.mapper.column_attrs + state.mapper.relationships
+        if c.key not in state.unloaded
     }
 
 
-def get_country(text):
-    country_info = geolocator.geocode(text, exactly_one=False, language="ru-ru")
-    return [i for i in country_info if i.raw["addresstype"] == "country"][0].raw["name"]
+async def get_country(db_session: AsyncSession, text):
+    gazetteer = get_gazetteer()
+    if gazetteer is not None and (country := gazetteer.get_country(text)) is not None:
+        return country
+    country_info = await geocoder.geocode(db_session, text)
+    return [i for i in country_info if i["addresstype"] == "country"][0]["name"]
 
 
-def get_city(text, country):
-    city_info = geolocator.geocode(f"{country} {text}", exactly_one=False, language="ru-ru")
-    return [i for i in city_info if i.raw["addresstype"] == "city" or i.raw["addresstype"] == "town"][0].raw
+async def get_city(db_session: AsyncSession, text, country):
+    gazetteer = get_gazetteer()
+    if gazetteer is not None and (city := gazetteer.get_city(text, country)) is not None:
+        return city
+    city_info = await geocoder.geocode(db_session, f"{country} {text}")
+    return [i for i in city_info if i["addresstype"] == "city" or i["addresstype"] == "town"][0]
 
 
-def get_city_and_country(text):
-    city_info = geolocator.geocode(f"{text}", exactly_one=False, language="ru-ru")
-    return [i for i in city_info if i.raw["addresstype"] == "city" or i.raw["addresstype"] == "town"][0].raw
+async def get_city_and_country(db_session: AsyncSession, text):
+    gazetteer = get_gazetteer()
+    if gazetteer is not None and (city := gazetteer.get_city_and_country(text)) is not None:
+        return city
+    city_info = await geocoder.geocode(db_session, f"{text}")
+    return [i for i in city_info if i["addresstype"] == "city" or i["addresstype"] == "town"][0]
+
+
+def get_incorrect_country_text(text):
+    gazetteer = get_gazetteer()
+    suggestions = gazetteer.suggest(text, COUNTRY) if gazetteer is not None else []
+    if not suggestions:
+        return INCORRECT_COUNTRY
+    return INCORRECT_COUNTRY_SUGGESTIONS.format(suggestions=", ".join(suggestions))
+
+
+def get_incorrect_city_text(text, country=None):
+    if country is None:
+        text, _, country = text.partition(",")
+        country = country.strip() or None
+    gazetteer = get_gazetteer()
+    suggestions = gazetteer.suggest(text, CITY, country) if gazetteer is not None else []
+    if not suggestions:
+        return INCORRECT_CITY
+    return INCORRECT_CITY_SUGGESTIONS.format(suggestions=", ".join(suggestions))
 
 
 @dataclass
@@ -52,17 +96,43 @@ class LocationInfo:
     address: Optional[dict]
 
 
-def get_location_info(lat: float, lon: float) -> LocationInfo:
-    location_info = geolocator.reverse((lat, lon), language="ru-ru")
+def get_local_location_info(lat: float, lon: float) -> Optional[dict]:
+    """
+    Reverse geocode with the local index, in the shape of a Nominatim reverse response
+    :return: response or None if there is no local index or no city nearby
+    """
+    reverse_geocoder = get_reverse_geocoder()
+    if reverse_geocoder is None:
+        return None
+    nearest = reverse_geocoder.nearest(lat, lon, config.reverse_geocoder_max_distance)
+    if nearest is None:
+        return None
+    city, country = nearest
+    return {"lat": str(lat), "lon": str(lon), "display_name": f"{city}, {country}",
+            "address": {"city": city, "country": country}}
+
+
+async def get_location_info(db_session: AsyncSession, lat: float, lon: float) -> LocationInfo:
+    location_info = get_local_location_info(lat, lon) or await geocoder.reverse(db_session, lat, lon)
     try:
-        city = location_info.raw["address"].get("city", location_info.raw["address"].get("town"))
-        country = location_info.raw["address"]["country"]
+        city = location_info["address"].get("city", location_info["address"].get("town"))
+        country = location_info["address"]["country"]
     except (IndexError, KeyError):
         return LocationInfo(is_ok=False, country=None, city=None, user_output=None, latitude=None, longitude=None,
                             address=None)
     return LocationInfo(is_ok=True, country=country, city=city,
                         user_output=COUNTRY_AND_CITY_RESPONSE.format(city=city, country=country), latitude=lat,
-                        longitude=lon, address=location_info.raw)
+                        longitude=lon, address=location_info)
+
+
+async def fill_home_coordinates(db_session: AsyncSession, user: User) -> None:
+    """
+    Geocode user's city for users registered before home coordinates were stored
+    :param user: User, changed in place
+    """
+    city_info = await get_city(db_session, user.city, user.country)
+    user.home_latitude = float(city_info["lat"])
+    user.home_longitude = float(city_info["lon"])
 
 
 def get_profile_info(user: User):
@@ -73,7 +143,24 @@ async def send_menu(message: types.Message):
     await message.answer(MENU_TEXT, reply_markup=get_menu_keyboard_markup())
 
 
+async def send_trip_map(message: types.Message, travel_model: Travel):
+    key = f"trip_map:{get_trip_map_key(travel_model)}"
+    file_id = await redis.get(key)
+    if file_id is not None:
+        try:
+            return await message.answer_photo(file_id.decode())
+        except TelegramBadRequest:
+            await redis.delete(key)
+    # Members of a shared travel opening it at once get one render
+    png = await trip_maps_in_flight.do(key, get_trip_map, travel_model)
+    sent_message = await message.answer_photo(BufferedInputFile(png, filename="map.png"))
+    await redis.set(key, sent_message.photo[-1].file_id, ex=config.trip_map_cache_ttl)
+
+
 async def send_travel_info(message: types.Message | types.CallbackQuery, travel_model: Travel):
+    await travel_model.awaitable_attrs.owner
+    await travel_model.awaitable_attrs.locations
+    await travel_model.awaitable_attrs.access_users
     if message.from_user.id != travel_model.owner_id and message.from_user.id not in [user.id for user in
                                                                                       travel_model.access_users]:
         if isinstance(message, types.Message):
@@ -89,48 +176,69 @@ async def send_travel_info(message: types.Message | types.CallbackQuery, travel_
     travel_dict["users"] = ", ".join([f'<a href="tg://user?id={user.id}">{user.name}</a>' for user in travel_model.access_users])
     if isinstance(message, types.Message):
         if len(travel_model.locations) > 1:
-            file = get_trip_map(travel_model)
-            await message.answer_photo(BufferedInputFile(file.read(), filename="map.png"))
-            file.close()
+            await send_trip_map(message, travel_model)
         await message.answer(message_to_answer.format(**travel_dict), parse_mode="html",
                              reply_markup=get_travel_info_keyboard_markup(travel_model,
                                                                           travel_model.owner.id == message.from_user.id))
     else:
         if len(travel_model.locations) > 1:
-            file = get_trip_map(travel_model)
-            await message.message.answer_photo(BufferedInputFile(file.read(), filename="map.png"))
-            file.close()
+            await send_trip_map(message.message, travel_model)
         await message.message.answer(message_to_answer.format(**travel_dict), parse_mode="html",
                                      reply_markup=get_travel_info_keyboard_markup(travel_model,
                                                                                   travel_model.owner.id == message.from_user.id))
         await message.message.delete()
 
 
-def get_paginated_travel_list(user: User, offset=0):
-    all_travels = user.created_travels + user.access_travels
-    all_travels.sort(key=lambda x: -x.id)
-    travels_out = all_travels[offset:offset + 5]
-    offset_left = -1 if offset - 5 < 0 else offset - 5
-    offset_right = -1 if min(offset + 5, len(all_travels)) == len(all_travels) else min(offset + 5, len(all_travels))
-    markup = get_travel_list_keyboard_markup(travels_out, offset_left, offset_right)
-    return TRAVEL_LIST_PAGE.format(current_page=offset // 5 + 1,
-                                   total_pages=max((len(all_travels) + 4) // 5, 1)), markup
-
-
-def get_paginated_travel_locations_list(user_model: User, travel_model: Travel, offset=0):
-    all_locations = travel_model.locations
-    all_locations.sort(key=lambda x: x.start_date)
-    locations_out = all_locations[offset:offset + 5]
-    offset_left = -1 if offset - 5 < 0 else offset - 5
-    offset_right = -1 if min(offset + 5, len(all_locations)) == len(all_locations) else min(offset + 5,
-                                                                                            len(all_locations))
-    markup = get_travel_locations_list_keyboard_markup(travel_model.id, locations_out, offset_left, offset_right,
+def get_page_offsets(offset: int, total: int) -> tuple[int, int]:
+    """
+    Offsets of the previous and the next pages, -1 if there is no such page
+    """
+    offset_left = -1 if offset - PAGE_SIZE < 0 else offset - PAGE_SIZE
+    offset_right = -1 if min(offset + PAGE_SIZE, total) == total else offset + PAGE_SIZE
+    return offset_left, offset_right
+
+
+def get_page_text(offset: int, total: int) -> str:
+    return TRAVEL_LIST_PAGE.format(current_page=offset // PAGE_SIZE + 1,
+                                   total_pages=max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1))
+
+
+async def get_paginated_travel_list(db_session: AsyncSession, user_id: int, offset=0):
+    travels_out, total = await get_travel_page(db_session, user_id, offset)
+    markup = get_travel_list_keyboard_markup(travels_out, *get_page_offsets(offset, total))
+    return get_page_text(offset, total), markup
+
+
+async def get_paginated_travel_locations_list(db_session: AsyncSession, user_model: User, travel_model: Travel,
+                                              offset=0):
+    locations_out, total = await get_location_page(db_session, travel_model.id, offset)
+    markup = get_travel_locations_list_keyboard_markup(travel_model.id, locations_out,
+                                                       *get_page_offsets(offset, total),
                                                        user_model.id == travel_model.owner_id)
-    return TRAVEL_LIST_PAGE.format(current_page=offset // 5 + 1,
-                                   total_pages=max((len(all_locations) + 4) // 5, 1)), markup
+    return get_page_text(offset, total), markup
+
+
+async def get_section(name: str, coroutine: Awaitable[str], timeout: float, placeholder: str) -> str:
+    """
+    Get text of a page section, or the placeholder if its source fails or does not answer in time
+    :param name: section name for logs
+    """
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coroutine, timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Section %s timed out after %g s", name, timeout)
+    except Exception:
+        logger.exception("Section %s failed", name)
+    finally:
+        logger.info("Section %s took %.3f s", name, time.perf_counter() - started)
+    return placeholder
 
 
 async def send_travel_location_info(message: types.Message | types.CallbackQuery, location_model: TravelLocation):
+    travel_model = await location_model.awaitable_attrs.travel
+    await travel_model.awaitable_attrs.owner
+    await travel_model.awaitable_attrs.access_users
     if message.from_user.id != location_model.travel.owner_id and message.from_user.id not in [user.id for user in
                                                                                                location_model.travel.access_users]:
         if isinstance(message, types.Message):
@@ -140,10 +248,17 @@ async def send_travel_location_info(message: types.Message | types.CallbackQuery
     object_dict = object_as_dict(location_model)
     object_dict["start_date"] = object_dict["start_date"].strftime("%d.%m.%Y")
     object_dict["end_date"] = object_dict["end_date"].strftime("%d.%m.%Y")
-    object_dict["weather"] = get_weather_for_dates(location_model.start_date, location_model.end_date,
-                                                   float(location_model.latitude), float(location_model.longitude))
-    object_dict["interesting_places"] = get_interesting_places_response(location_model.latitude, location_model.longitude)
-    object_dict["food_places"] = get_foods_response(location_model.latitude, location_model.longitude)
+    object_dict["weather"], object_dict["interesting_places"], object_dict["food_places"] = await asyncio.gather(
+        get_section("weather", get_weather_for_dates(location_model.start_date, location_model.end_date,
+                                                     float(location_model.latitude),
+                                                     float(location_model.longitude)),
+                    config.weather_timeout, WEATHER_UNAVAILABLE),
+        get_section("interesting places",
+                    get_interesting_places_response(location_model.latitude, location_model.longitude),
+                    config.places_timeout, PLACES_UNAVAILABLE),
+        get_section("food places", get_foods_response(location_model.latitude, location_model.longitude),
+                    config.places_timeout, PLACES_UNAVAILABLE),
+    )
     if isinstance(message, types.Message):
         await message.answer(TRAVEL_LOCATION_INFO.format(**object_dict),
                              reply_markup=get_travel_location_info_keyboard_markup(location_model,
@@ -154,21 +269,19 @@ async def send_travel_location_info(message: types.Message | types.CallbackQuery
                                                                                               location_model.travel.owner.id == message.from_user.id))
 
 
-def get_paginated_travel_notes_list(user_model: User, travel_model: Travel, offset=0):
-    all_notes = travel_model.notes
-    if user_model.id != travel_model.owner_id:
-        all_notes = [note for note in all_notes if note.is_public]
-    all_notes.sort(key=lambda x: -x.id)
-    notes_out = all_notes[offset:offset + 5]
-    offset_left = -1 if offset - 5 < 0 else offset - 5
-    offset_right = -1 if min(offset + 5, len(all_notes)) == len(all_notes) else min(offset + 5, len(all_notes))
-    markup = get_travel_notes_list_keyboard_markup(travel_model.id, notes_out, offset_left, offset_right,
+async def get_paginated_travel_notes_list(db_session: AsyncSession, user_model: User, travel_model: Travel,
+                                          offset=0):
+    notes_out, total = await get_note_page(db_session, travel_model.id, user_model.id != travel_model.owner_id,
+                                           offset)
+    markup = get_travel_notes_list_keyboard_markup(travel_model.id, notes_out, *get_page_offsets(offset, total),
                                                    user_model.id == travel_model.owner_id)
-    return TRAVEL_LIST_PAGE.format(current_page=offset // 5 + 1,
-                                   total_pages=max((len(all_notes) + 4) // 5, 1)), markup
+    return get_page_text(offset, total), markup
 
 
 async def send_travel_note_info(message: types.Message | types.CallbackQuery, note_model: TravelNote):
+    travel_model = await note_model.awaitable_attrs.travel
+    await travel_model.awaitable_attrs.owner
+    await travel_model.awaitable_attrs.access_users
     if message.from_user.id != note_model.travel.owner_id and message.from_user.id not in [user.id for user in
                                                                                            note_model.travel.access_users] \
             or (message.from_user.id != note_model.travel.owner_id and not note_model.is_public):
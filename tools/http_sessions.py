@@ -0,0 +1,37 @@
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+sessions: list["SharedSession"] = []
+
+
+class SharedSession:
+    """
+    aiohttp session shared by all requests of a module. Requests coalesced by SingleFlight outlive the caller
+    that started them, so they must not use a session owned by that caller
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        sessions.append(self)
+
+    def get(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(**self.kwargs)
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        # A session of a finished loop cannot be closed any more, it is only dropped
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+
+
+async def close_sessions() -> None:
+    for session in sessions:
+        await session.close()
@@ -1,172 +1,125 @@
-import io
+import asyncio
+import hashlib
+import logging
 import random
-from tempfile import NamedTemporaryFile
 
+import aiohttp
 import mercantile
-import requests
-from cairo import ImageSurface, FORMAT_ARGB32, Context
 
-
-def get_map(west, south, east, north, zoom):
+import config
+from tools.geometry import project_to_web_mercator, simplify_polyline, meters_per_pixel, choose_zoom
+from tools.map_render import render_map
+from tools.render_engine import render_engine
+from tools.http_sessions import SharedSession
+from tools.routing import get_route, legs_in_flight
+from tools.singleflight import SingleFlight
+from tools.tile_cache import get_tile_cache
+
+logger = logging.getLogger(__name__)
+
+TILE_SERVERS = ("a", "b", "c")
+TILE_URL = "https://{server}.tile.openstreetmap.org/{zoom}/{x}/{y}.png"
+TILE_HEADERS = {"User-Agent": "some-valid-user-agent"}
+
+tile_server_semaphores = {server: asyncio.Semaphore(config.tile_server_concurrency) for server in TILE_SERVERS}
+tiles_in_flight = SingleFlight("tile")
+tile_session = SharedSession(headers=TILE_HEADERS, timeout=aiohttp.ClientTimeout(total=config.tile_fetch_timeout))
+
+
+async def fetch_tile(tile: mercantile.Tile) -> bytes:
+    server = random.choice(TILE_SERVERS)
+    url = TILE_URL.format(server=server, zoom=tile.z, x=tile.x, y=tile.y)
+    async with tile_server_semaphores[server]:
+        async with tile_session.get().get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+
+async def fetch_tiles(tiles: list[mercantile.Tile]) -> list[bytes]:
+    """
+    Get tiles from the persistent cache and download missing ones in parallel, limiting the number
+    of simultaneous requests to each mirror. A tile already being downloaded for another map is not requested again
+    :param tiles: tiles to get
+    :return: PNG bytes of the tiles in the same order
+    """
+    tile_cache = get_tile_cache()
+    cached = await tile_cache.get_many(tiles)
+    missing = [t for t in tiles if t not in cached]
+    if missing:
+        fetched = dict(zip(missing, await asyncio.gather(*[tiles_in_flight.do(t, fetch_tile, t) for t in missing])))
+        await tile_cache.put_many(fetched)
+        cached.update(fetched)
+    return [cached[t] for t in tiles]
+
+
+async def get_map(west, south, east, north, zoom, coordinates) -> bytes:
+    """
+    Render map of the bbox with the route drawn over it in the render engine
+    :param coordinates: route points as (lon, lat)
+    :return: encoded PNG
+    """
     tiles = list(mercantile.tiles(west, south, east, north, zoom))
+    tile_data = await fetch_tiles(tiles)
+    route = simplify_polyline(project_to_web_mercator(coordinates),
+                              config.route_simplify_tolerance * meters_per_pixel(zoom))
+    image = await render_engine.render(render_map, (west, south, east, north), tiles, tile_data, route)
+    logger.info("Map rendered: engine %s, tiles in flight %s, route legs in flight %s",
+                render_engine.stats(), tiles_in_flight.stats(), legs_in_flight.stats())
+    return image
 
-    min_x = min([t.x for t in tiles])
-    min_y = min([t.y for t in tiles])
-    max_x = max([t.x for t in tiles])
-    max_y = max([t.y for t in tiles])
-
-    tile_size = (256, 256)
-    map_image = ImageSurface(
-        FORMAT_ARGB32,
-        tile_size[0] * (max_x - min_x + 1),
-        tile_size[1] * (max_y - min_y + 1)
-    )
-
-    ctx = Context(map_image)
-
-    for t in tiles:
-        server = random.choice(['a', 'b', 'c'])
-        url = 'https://{server}.tile.openstreetmap.org/{zoom}/{x}/{y}.png'.format(
-            server=server,
-            zoom=t.z,
-            x=t.x,
-            y=t.y
-        )
-        response = requests.get(url, headers={"User-Agent": "some-valid-user-agent"}).content
-        img = ImageSurface.create_from_png(io.BytesIO(response))
-
-        ctx.set_source_surface(
-            img,
-            (t.x - min_x) * tile_size[0],
-            (t.y - min_y) * tile_size[0]
-        )
-        ctx.paint()
-
-    bounds = {
-        "left": min([mercantile.xy_bounds(t).left for t in tiles]),
-        "right": max([mercantile.xy_bounds(t).right for t in tiles]),
-        "bottom": min([mercantile.xy_bounds(t).bottom for t in tiles]),
-        "top": max([mercantile.xy_bounds(t).top for t in tiles]),
-    }
-
-    kx = map_image.get_width() / (bounds['right'] - bounds['left'])
-    ky = map_image.get_height() / (bounds['top'] - bounds['bottom'])
 
-    left_top = mercantile.xy(west, north)
-    right_bottom = mercantile.xy(east, south)
-    offset_left = (left_top[0] - bounds['left']) * kx
-    offset_top = (bounds['top'] - left_top[1]) * ky
-    offset_right = (bounds['right'] - right_bottom[0]) * kx
-    offset_bottom = (right_bottom[1] - bounds['bottom']) * ky
+def get_trip_locations(trip):
+    locations = trip.locations
+    locations.sort(key=lambda location: location.start_date)
+    return locations
 
-    map_image_clipped = ImageSurface(
-        FORMAT_ARGB32,
-        map_image.get_width() - int(offset_left + offset_right),
-        map_image.get_height() - int(offset_top + offset_bottom),
-    )
 
-    ctx = Context(map_image_clipped)
-    ctx.set_source_surface(map_image, -offset_left, -offset_top)
-    ctx.paint()
-    return map_image_clipped
+def get_trip_map_key(trip) -> str:
+    """
+    Key of the trip map which changes whenever the ordered trip locations change
+    :param trip: Travel
+    :return: hash of the ordered location coordinates
+    """
+    coords = ";".join([f"{location.longitude},{location.latitude}" for location in get_trip_locations(trip)])
+    return hashlib.sha256(coords.encode()).hexdigest()
 
 
-def get_trip_map(trip):
+async def get_trip_map(trip):
     west = 180
     south = 90
     east = -180
     north = -90
-    locations = trip.locations
-    locations.sort(key=lambda location: location.start_date)
-    coords = ";".join([f"{location.longitude},{location.latitude}" for location in locations])
-    route = requests.get(f"https://router.project-osrm.org/route/v1/driving/{coords}", params={
-        "geometries": "geojson",
-        "overview": "full",
-    })
-    route = route.json()
-    for coord in route['routes'][0]['geometry']['coordinates']:
+    locations = get_trip_locations(trip)
+    coordinates = await get_route([(location.longitude, location.latitude) for location in locations])
+    for coord in coordinates:
         west = min(west, float(coord[0]))
         south = min(south, float(coord[1]))
         east = max(east, float(coord[0]))
         north = max(north, float(coord[1]))
 
-    zoom = 2
-    while True:
-        tiles = list(mercantile.tiles(west, south, east, north, zoom))
-        if len(tiles) >= 10:
-            break
-        zoom += 1
-    map_image = get_map(west, south, east, north, zoom)
-    coordinates = route['routes'][0]['geometry']['coordinates']
-    left_top = mercantile.xy(west, north)
-    right_bottom = mercantile.xy(east, south)
-
-    kx = map_image.get_width() / (right_bottom[0] - left_top[0])
-    ky = map_image.get_height() / (right_bottom[1] - left_top[1])
-    context = Context(map_image)
-    for c in coordinates:
-        x, y = mercantile.xy(c[0], c[1])
-        x = (x - left_top[0]) * kx
-        y = (y - left_top[1]) * ky
-        context.line_to(x, y)
-
-    context.set_source_rgba(1, 0, 0, 0.5)
-    context.set_line_width(10)
-    context.stroke()
-    f = NamedTemporaryFile(mode="w+b", suffix=".png")
-    map_image.write_to_png(f.name)
-    return f
+    zoom = choose_zoom(west, south, east, north, config.map_target_size, config.map_max_tiles, config.map_min_zoom,
+                       config.map_max_zoom)
+    return await get_map(west, south, east, north, zoom, coordinates)
 
 
-def get_trip_route(trip, user):
-    from tools.helpers import get_city
-
+async def get_trip_route(trip, user):
     west = 180
     south = 90
     east = -180
     north = -90
-    user_city_coords = get_city(user.city, user.country)["lat"], get_city(user.city, user.country)["lon"]
-    locations = trip.locations
-    locations.sort(key=lambda location: location.start_date)
-    coords = ";".join([f"{location[1]},{location[0]}" for location in
-                       [user_city_coords, [locations[0].latitude, locations[0].longitude]]])
-    route = requests.get(f"https://router.project-osrm.org/route/v1/driving/{coords}", params={
-        "geometries": "geojson",
-        "overview": "full",
-    })
-    route = route.json()
-    for coord in route['routes'][0]['geometry']['coordinates']:
+    locations = get_trip_locations(trip)
+    coordinates = await get_route([(user.home_longitude, user.home_latitude),
+                                   (locations[0].longitude, locations[0].latitude)])
+    for coord in coordinates:
         west = min(west, float(coord[0]))
         south = min(south, float(coord[1]))
         east = max(east, float(coord[0]))
         north = max(north, float(coord[1]))
 
-    zoom = 2
-    while True:
-        tiles = list(mercantile.tiles(west, south, east, north, zoom))
-        if len(tiles) >= 10:
-            break
-        zoom += 1
-        if zoom == 18:
-            break
-    map_image = get_map(west, south, east, north, zoom)
-    coordinates = route['routes'][0]['geometry']['coordinates']
+    zoom = choose_zoom(west, south, east, north, config.map_target_size, config.map_max_tiles, config.map_min_zoom,
+                       config.map_max_zoom)
     left_top = mercantile.xy(west, north)
     right_bottom = mercantile.xy(east, south)
     if right_bottom[0] - left_top[0] == 0 or right_bottom[1] - left_top[1] == 0:
         return None
-    kx = map_image.get_width() / (right_bottom[0] - left_top[0])
-    ky = map_image.get_height() / (right_bottom[1] - left_top[1])
-    context = Context(map_image)
-    for c in coordinates:
-        x, y = mercantile.xy(c[0], c[1])
-        x = (x - left_top[0]) * kx
-        y = (y - left_top[1]) * ky
-        context.line_to(x, y)
-
-    context.set_source_rgba(1, 0, 0, 0.5)
-    context.set_line_width(10)
-    context.stroke()
-    f = NamedTemporaryFile(mode="w+b", suffix=".png")
-    map_image.write_to_png(f.name)
-    return f
+    return await get_map(west, south, east, north, zoom, coordinates)
@@ -0,0 +1,101 @@
+import io
+
+import mercantile
+import numpy as np
+from cairo import ImageSurface, FORMAT_ARGB32, Context
+
+from tools.tile_cache import get_surface_cache
+
+TILE_SIZE = (256, 256)
+
+
+def compose_map(west, south, east, north, tiles: list[mercantile.Tile], tile_data: list[bytes]) -> ImageSurface:
+    min_x = min([t.x for t in tiles])
+    min_y = min([t.y for t in tiles])
+    max_x = max([t.x for t in tiles])
+    max_y = max([t.y for t in tiles])
+
+    map_image = ImageSurface(
+        FORMAT_ARGB32,
+        TILE_SIZE[0] * (max_x - min_x + 1),
+        TILE_SIZE[1] * (max_y - min_y + 1)
+    )
+
+    ctx = Context(map_image)
+
+    surface_cache = get_surface_cache()
+    for t, data in zip(tiles, tile_data):
+        surface = surface_cache.get(t)
+        if surface is None:
+            surface = ImageSurface.create_from_png(io.BytesIO(data))
+            surface_cache.put(t, surface)
+
+        ctx.set_source_surface(
+            surface,
+            (t.x - min_x) * TILE_SIZE[0],
+            (t.y - min_y) * TILE_SIZE[0]
+        )
+        ctx.paint()
+
+    bounds = {
+        "left": min([mercantile.xy_bounds(t).left for t in tiles]),
+        "right": max([mercantile.xy_bounds(t).right for t in tiles]),
+        "bottom": min([mercantile.xy_bounds(t).bottom for t in tiles]),
+        "top": max([mercantile.xy_bounds(t).top for t in tiles]),
+    }
+
+    kx = map_image.get_width() / (bounds['right'] - bounds['left'])
+    ky = map_image.get_height() / (bounds['top'] - bounds['bottom'])
+
+    left_top = mercantile.xy(west, north)
+    right_bottom = mercantile.xy(east, south)
+    offset_left = (left_top[0] - bounds['left']) * kx
+    offset_top = (bounds['top'] - left_top[1]) * ky
+    offset_right = (bounds['right'] - right_bottom[0]) * kx
+    offset_bottom = (right_bottom[1] - bounds['bottom']) * ky
+
+    map_image_clipped = ImageSurface(
+        FORMAT_ARGB32,
+        map_image.get_width() - int(offset_left + offset_right),
+        map_image.get_height() - int(offset_top + offset_bottom),
+    )
+
+    ctx = Context(map_image_clipped)
+    ctx.set_source_surface(map_image, -offset_left, -offset_top)
+    ctx.paint()
+    return map_image_clipped
+
+
+def encode_png(surface: ImageSurface) -> bytes:
+    buffer = io.BytesIO()
+    surface.write_to_png(buffer)
+    return buffer.getvalue()
+
+
+def render_map(bbox: tuple[float, float, float, float], tiles: list[mercantile.Tile], tile_data: list[bytes],
+               route: np.ndarray) -> bytes:
+    """
+    Compose tiles, draw the route over them and encode the result. Takes only plain data,
+    so it can run in a worker process
+    :param bbox: west, south, east, north of the map
+    :param tiles: tiles covering the bbox
+    :param tile_data: PNG bytes of the tiles in the same order
+    :param route: route points projected to Web Mercator
+    :return: encoded PNG
+    """
+    west, south, east, north = bbox
+    map_image = compose_map(west, south, east, north, tiles, tile_data)
+    left_top = mercantile.xy(west, north)
+    right_bottom = mercantile.xy(east, south)
+
+    kx = map_image.get_width() / (right_bottom[0] - left_top[0])
+    ky = map_image.get_height() / (right_bottom[1] - left_top[1])
+    context = Context(map_image)
+    pixels = (route - left_top) * (kx, ky)
+    for x, y in pixels.tolist():
+        context.line_to(x, y)
+
+    context.set_source_rgba(1, 0, 0, 0.5)
+    context.set_line_width(10)
+    context.stroke()
+    return encode_png(map_image)
@@ -3,8 +3,9 @@ from typing import Literal
 
 from aiogram.filters.callback_data import CallbackData
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from sqlalchemy import Row
 
-from database.models import Travel, TravelLocation, TravelNote
+from database.models import TravelLocation, TravelNote
 
 
 class MenuActions(Enum):
@@ -131,12 +132,12 @@ class TravelListPaginationCallbackFactory(CallbackData, prefix="travel_list_pagi
     offset: int
 
 
-def get_travel_list_keyboard_markup(travel_list: list[Travel], offset_left: int, offset_right: int):
+def get_travel_list_keyboard_markup(travel_list: list[Row], offset_left: int, offset_right: int):
     builder = InlineKeyboardBuilder()
     sizes = []
     for travel in travel_list:
         builder.button(
-            text=f"{travel.title} | {travel.owner.name}",
+            text=f"{travel.title} | {travel.owner_name}",
             callback_data=TravelListCallbackFactory(travel_id=travel.id)
         )
         sizes.append(1)
@@ -184,7 +185,7 @@ class TravelLocationsListPaginationCallbackFactory(CallbackData, prefix="travel_
     travel_id: int
 
 
-def get_travel_locations_list_keyboard_markup(travel_id: int, locations_list: list[TravelLocation], offset_left: int,
+def get_travel_locations_list_keyboard_markup(travel_id: int, locations_list: list[Row], offset_left: int,
                                               offset_right: int, is_owner: bool):
     builder = InlineKeyboardBuilder()
     sizes = [1]
@@ -257,7 +258,7 @@ class TravelNoteCreateCallbackFactory(CallbackData, prefix="travel_note_create")
     travel_id: int
 
 
-def get_travel_notes_list_keyboard_markup(travel_id: int, notes_list: list[TravelNote], offset_left: int,
+def get_travel_notes_list_keyboard_markup(travel_id: int, notes_list: list[Row], offset_left: int,
                                           offset_right: int, is_owner: bool):
     builder = InlineKeyboardBuilder()
     sizes = [1]
@@ -1,63 +1,153 @@
+import asyncio
+import json
+import logging
 import random
+from typing import Optional
 
-import requests
+import aiohttp
 
 import config
+from database.redis_connector import redis
+from tools import geohash
+from tools.http_sessions import SharedSession
+from tools.singleflight import SingleFlight
 from translations import INTERESTING_PLACE, INTERESTING_PLACES_NOT_FOUND, FOOD_PLACE, FOOD_PLACES_NOT_FOUND
 
+PLACES_URL = ("https://api.opentripmap.com/0.1/ru/places/radius?radius=10000&lon={lon}&lat={lat}&kinds={kinds}&rate=3"
+              "&apikey={token}")
+PLACE_KINDS = ("interesting_places", "foods")
+PLACES_KEY = "places:{cell}:{kinds}"
+PLACE_DETAILS_URL = "https://api.opentripmap.com/0.1/ru/places/xid/{xid}?apikey={token}"
+PLACE_ADDRESS_KEY = "place_address:{xid}"
+# Address parts in the order Nominatim lists them in display_name
+ADDRESS_PARTS = ("house_number", "road", "pedestrian", "neighbourhood", "suburb", "city", "town", "village",
+                 "county", "state", "postcode", "country")
 
-def get_interesting_places(lat, lon):
-    url = (
-        f"https://api.opentripmap.com/0.1/ru/places/radius?radius=10000&lon={lon}&lat={lat}&kinds=interesting_places&rate=3"
-        f"&apikey={config.opentripmap_api_token}")
-    response = requests.get(url)
-    return response.json()
+logger = logging.getLogger(__name__)
 
+places_in_flight = SingleFlight("places")
+places_session = SharedSession(timeout=aiohttp.ClientTimeout(total=config.places_timeout))
 
-def get_interesting_places_response(lat, lon):
-    from tools.helpers import get_location_info
-    places = get_interesting_places(lat, lon)
+
+async def fetch_json(url: str):
+    async with places_session.get().get(url) as response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+
+async def get_details(url: str) -> Optional[dict]:
+    """
+    Place details or None if they could not be loaded
+    """
+    try:
+        details = await places_in_flight.do(url, fetch_json, url)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.warning("Place details request failed: %r", e)
+        return None
+    if not isinstance(details, dict) or "error" in details:
+        logger.warning("Place details request failed: %s", details)
+        return None
+    return details
+
+
+def format_address(place: dict, details: dict) -> str:
+    address = details.get("address") or {}
+    parts = [address[part] for part in ADDRESS_PARTS if address.get(part)]
+    if not parts:
+        lon, lat = place['geometry']['coordinates']
+        return f"{lat:.6f}, {lon:.6f}"
+    return ", ".join(parts)
+
+
+async def get_addresses(places: list[dict]) -> list[str]:
+    """
+    Addresses of OpenTripMap places from place details, cached by xid. Details of the places
+    that are not cached are requested concurrently. A place without an address or whose details failed to load
+    gets its coordinates, they are cached only in the first case
+    :param places: features of places/radius response
+    :return: addresses in the same order
+    """
+    keys = [PLACE_ADDRESS_KEY.format(xid=place['properties']['xid']) for place in places]
+    addresses = [address.decode() if address is not None else None for address in await redis.mget(keys)]
+    missing = [i for i, address in enumerate(addresses) if address is None]
+    if missing:
+        urls = [PLACE_DETAILS_URL.format(xid=places[i]['properties']['xid'], token=config.opentripmap_api_token)
+                for i in missing]
+        details = await asyncio.gather(*[get_details(url) for url in urls])
+        async with redis.pipeline(transaction=False) as pipeline:
+            for i, place_details in zip(missing, details):
+                addresses[i] = format_address(places[i], place_details or {})
+                if place_details is not None:
+                    pipeline.set(keys[i], addresses[i], ex=config.place_address_cache_ttl)
+            await pipeline.execute()
+    return addresses
+
+
+async def load_places(cell: str) -> dict:
+    """
+    Places of all PLACE_KINDS around the center of the geohash cell, cached per cell
+    """
+    kinds = ",".join(PLACE_KINDS)
+    key = PLACES_KEY.format(cell=cell, kinds=kinds)
+    cached = await redis.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    lat, lon = geohash.decode(cell)
+    places = await fetch_json(PLACES_URL.format(lat=f"{lat:.6f}", lon=f"{lon:.6f}", kinds=kinds,
+                                                token=config.opentripmap_api_token))
+    if "features" in places:
+        await redis.set(key, json.dumps(places), ex=config.places_cache_ttl)
+    return places
+
+
+async def get_places(lat, lon, kind: str) -> dict:
+    """
+    Places of the kind near the point. Places of all kinds are requested together and shared by the points
+    of one geohash cell of PLACES_CACHE_PRECISION
+    """
+    cell = geohash.encode(float(lat), float(lon), config.places_cache_precision)
+    places = await places_in_flight.do(cell, load_places, cell, distributed=config.singleflight_distributed)
+    # New dict, as the response functions change the result shared by coalesced callers
+    return {**places, "features": [place for place in places.get("features", [])
+                                   if kind in place['properties']['kinds'].split(",")]}
+
+
+async def get_interesting_places(lat, lon):
+    return await get_places(lat, lon, "interesting_places")
+
+
+async def get_interesting_places_response(lat, lon):
+    places = await get_interesting_places(lat, lon)
     if places and places["features"]:
         max_rate = max([place['properties']['rate'] for place in places["features"]])
         places["features"] = [place for place in places["features"] if place['properties']['rate'] == max_rate]
         features_dict = {place['properties']['name']: place for place in places["features"]}
         places["features"] = list(features_dict.values())
-        random.seed(config.random_seed)
-        random.shuffle(places["features"])
+        random.Random(config.random_seed).shuffle(places["features"])
         places["features"] = places["features"][:5]
         response = ""
-        for place in places["features"]:
-            location_info = get_location_info(place['geometry']['coordinates'][1], place['geometry']['coordinates'][0])
-            response += INTERESTING_PLACE.format(name=place['properties']['name'],
-                                                 address=location_info.address["display_name"])
+        for place, address in zip(places["features"], await get_addresses(places["features"])):
+            response += INTERESTING_PLACE.format(name=place['properties']['name'], address=address)
         return response
     return INTERESTING_PLACES_NOT_FOUND
 
 
-def get_foods(lat, lon):
-    url = (
-        f"https://api.opentripmap.com/0.1/ru/places/radius?radius=10000&lon={lon}&lat={lat}&kinds=foods&rate=3"
-        f"&apikey={config.opentripmap_api_token}")
-    response = requests.get(url)
-    return response.json()
+async def get_foods(lat, lon):
+    return await get_places(lat, lon, "foods")
 
 
-def get_foods_response(lat, lon):
-    from tools.helpers import get_location_info
-    places = get_foods(lat, lon)
+async def get_foods_response(lat, lon):
+    places = await get_foods(lat, lon)
     if places and places["features"]:
         max_rate = max([place['properties']['rate'] for place in places["features"]])
         places["features"] = [place for place in places["features"] if place['properties']['rate'] == max_rate]
         features_dict = {place['properties']['name']: place for place in places["features"]}
         places["features"] = list(features_dict.values())
-        random.seed(config.random_seed)
-        random.shuffle(places["features"])
+        random.Random(config.random_seed).shuffle(places["features"])
         places["features"] = places["features"][:5]
         response = ""
-        for place in places["features"]:
-            location_info = get_location_info(place['geometry']['coordinates'][1], place['geometry']['coordinates'][0])
-            response += FOOD_PLACE.format(name=place['properties']['name'],
-                                          address=location_info.address["display_name"],
+        for place, address in zip(places["features"], await get_addresses(places["features"])):
+            response += FOOD_PLACE.format(name=place['properties']['name'], address=address,
                                           rate=place['properties']['rate'])
         return response
     return FOOD_PLACES_NOT_FOUND
@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+import config
+from tools.tile_cache import get_surface_cache
+
+
+def run_job(function: Callable, *args) -> tuple:
+    """
+    Run function in a worker and return its result with the worker pid and surface cache counters,
+    the cache lives in the worker process and is not visible from the bot process otherwise
+    """
+    return function(*args), os.getpid(), get_surface_cache().stats()
+
+
+class RenderEngine:
+    """
+    Runs CPU-bound rendering in a bounded process pool so it does not block the event loop
+    """
+
+    def __init__(self, pool_size: int, queue_size: int):
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.waiting = 0
+        self.in_pool = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self._worker_stats: dict[int, dict] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.pool_size,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def render(self, function: Callable, *args):
+        """
+        Run function in the pool. At most queue_size jobs are submitted to the pool at once,
+        the rest wait here
+        :param function: picklable module-level function
+        :param args: plain picklable arguments
+        :return: function result
+        """
+        if self.pool_size <= 0:
+            return self._record(*run_job(function, *args))
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.queue_size)
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_pool += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return self._record(*await loop.run_in_executor(self._get_executor(), run_job, function, *args))
+        finally:
+            self.in_pool -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def _record(self, result, pid: int, surface_cache_stats: dict):
+        self._worker_stats[pid] = surface_cache_stats
+        return result
+
+    def surface_cache_stats(self) -> dict:
+        """
+        Surface cache counters summed over the workers as of their last job. Every worker has its own cache,
+        so max_bytes is the memory all of them may take together
+        """
+        total = {"workers": len(self._worker_stats)}
+        for worker_stats in self._worker_stats.values():
+            for name, value in worker_stats.items():
+                total[name] = total.get(name, 0) + value
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "waiting": self.waiting,
+            "in_pool": self.in_pool,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "surface_cache": self.surface_cache_stats(),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._worker_stats.clear()
+
+
+render_engine = RenderEngine(config.render_pool_size, config.render_queue_size)
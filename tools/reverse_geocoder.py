@@ -0,0 +1,105 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+import config
+from tools import geohash
+
+CELL_PRECISION = 4
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class ReverseGeocoder:
+    """
+    Nearest city lookup over city centroids grouped by geohash cell.
+
+    Cities are stored as parallel arrays sorted by cell, so the cities of a cell
+    are a contiguous slice found by binary search.
+    """
+
+    def __init__(self, cells: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray, names: np.ndarray,
+                 countries: np.ndarray):
+        self.cells = cells
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.names = names
+        self.countries = countries
+
+    @classmethod
+    def build(cls, cities: list[tuple[str, str, float, float]]) -> "ReverseGeocoder":
+        """
+        :param cities: (name, country, lat, lon)
+        """
+        cells = np.array([geohash.encode(lat, lon, CELL_PRECISION) for _, _, lat, lon in cities],
+                         dtype=f"S{CELL_PRECISION}")
+        order = np.argsort(cells, kind="stable")
+        return cls(
+            cells[order],
+            np.array([city[2] for city in cities], dtype=np.float32)[order],
+            np.array([city[3] for city in cities], dtype=np.float32)[order],
+            np.array([city[0] for city in cities], dtype=str)[order],
+            np.array([city[1] for city in cities], dtype=str)[order],
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ReverseGeocoder":
+        with np.load(path) as data:
+            return cls(data["cells"], data["latitudes"], data["longitudes"], data["names"], data["countries"])
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as file:
+            np.savez(file, cells=self.cells, latitudes=self.latitudes, longitudes=self.longitudes, names=self.names,
+                     countries=self.countries)
+
+    def nearest(self, lat: float, lon: float, max_distance: float) -> Optional[tuple[str, str]]:
+        """
+        Nearest city to the point
+        :param max_distance: max distance to the city centroid in km
+        :return: city and country or None if there is no city close enough
+        """
+        indices = []
+        for cell in get_search_cells(lat, lon, max_distance):
+            cell = cell.encode()
+            start, end = np.searchsorted(self.cells, cell, "left"), np.searchsorted(self.cells, cell, "right")
+            indices.append(np.arange(start, end))
+        indices = np.concatenate(indices)
+        if not len(indices):
+            return None
+        lat1, lon1 = np.radians(lat), np.radians(lon)
+        lat2, lon2 = np.radians(self.latitudes[indices]), np.radians(self.longitudes[indices])
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(
+            np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        ))
+        nearest = int(np.argmin(distances))
+        if distances[nearest] > max_distance:
+            return None
+        index = indices[nearest]
+        return str(self.names[index]), str(self.countries[index])
+
+
+def get_search_cells(lat: float, lon: float, max_distance: float) -> list[str]:
+    """
+    Cells of the point and around it covering every point within max_distance km
+    """
+    cell = geohash.encode(lat, lon, CELL_PRECISION)
+    south, west, north, east = geohash.decode_bounds(cell)
+    # Cells are narrowest at the edge of the search area closest to a pole
+    far_lat = min(abs(lat) + max_distance / KM_PER_DEGREE, 90.0)
+    cell_height = (north - south) * KM_PER_DEGREE
+    cell_width = (east - west) * KM_PER_DEGREE * math.cos(math.radians(far_lat))
+    return geohash.neighbours(cell, math.ceil(max_distance / cell_height), math.ceil(max_distance / cell_width))
+
+
+reverse_geocoder: Optional[ReverseGeocoder] = None
+
+
+def get_reverse_geocoder() -> Optional[ReverseGeocoder]:
+    """
+    Local reverse geocoder if REVERSE_GEOCODER_PATH is configured
+    """
+    global reverse_geocoder
+    if reverse_geocoder is None and config.reverse_geocoder_path:
+        reverse_geocoder = ReverseGeocoder.load(config.reverse_geocoder_path)
+    return reverse_geocoder
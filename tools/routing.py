@@ -0,0 +1,94 @@
+import asyncio
+
+import aiohttp
+
+import config
+from database.redis_connector import redis
+from tools.http_sessions import SharedSession
+from tools.singleflight import SingleFlight
+
+ROUTE_LEG_KEY = "route_leg:{start};{end}"
+
+legs_in_flight = SingleFlight("route_leg")
+osrm_session = SharedSession(timeout=aiohttp.ClientTimeout(total=config.osrm_timeout))
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> list[list[float]]:
+    """
+    Decode Google encoded polyline as returned by OSRM with geometries=polyline
+    :param encoded: encoded polyline
+    :param precision: number of decimal digits used for encoding
+    :return: list of [lon, lat] like OSRM geojson geometry
+    """
+    coordinates = []
+    factor = 10 ** precision
+    index = lat = lon = 0
+    while index < len(encoded):
+        values = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += values[0]
+        lon += values[1]
+        coordinates.append([lon / factor, lat / factor])
+    return coordinates
+
+
+def format_point(point: tuple[float, float]) -> str:
+    return f"{float(point[0]):.6f},{float(point[1]):.6f}"
+
+
+async def fetch_leg(start: str, end: str) -> str:
+    async with osrm_session.get().get(f"{config.osrm_url}/route/v1/driving/{start};{end}", params={
+        "geometries": "polyline",
+        "overview": "full",
+    }) as response:
+        route = await response.json(content_type=None)
+    return route['routes'][0]['geometry']
+
+
+async def load_leg(key: str, start: str, end: str) -> str:
+    """
+    Fetch leg geometry and cache it. The cache is checked again, as another worker may have fetched the leg
+    while this one was waiting for the lock
+    """
+    geometry = await redis.get(key)
+    if geometry is not None:
+        return geometry.decode()
+    geometry = await fetch_leg(start, end)
+    await redis.set(key, geometry, ex=config.route_leg_cache_ttl)
+    return geometry
+
+
+async def get_route(points: list[tuple[float, float]]) -> list[list[float]]:
+    """
+    Get driving route through the points. Geometry of every leg (pair of consecutive points) is cached
+    as encoded polyline, so only new or changed legs are requested from OSRM
+    :param points: list of (lon, lat)
+    :return: route geometry as list of [lon, lat]
+    """
+    points = [format_point(point) for point in points]
+    legs = list(zip(points, points[1:]))
+    keys = [ROUTE_LEG_KEY.format(start=start, end=end) for start, end in legs]
+    geometries = [geometry.decode() if geometry is not None else None for geometry in await redis.mget(keys)]
+    missing = [i for i, geometry in enumerate(geometries) if geometry is None]
+    if missing:
+        fetched = await asyncio.gather(*[
+            legs_in_flight.do(keys[i], load_leg, keys[i], *legs[i], distributed=config.singleflight_distributed)
+            for i in missing
+        ])
+        for i, geometry in zip(missing, fetched):
+            geometries[i] = geometry
+    coordinates = []
+    for geometry in geometries:
+        leg = decode_polyline(geometry)
+        # Every leg starts where the previous one ends
+        coordinates.extend(leg[1:] if coordinates else leg)
+    return coordinates
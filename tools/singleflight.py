@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+
+from redis.exceptions import LockError
+
+import config
+from database.redis_connector import redis
+
+LOCK_KEY = "singleflight:{name}:{key}"
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls: while a call with some key is in flight, callers with the same key
+    wait for its result instead of calling again.
+
+    With distributed=True the call also holds a Redis lock for the key, so workers run identical calls
+    one after another. This only saves upstream requests if the called function checks a shared cache first.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable], *args, distributed: bool = False):
+        """
+        Call func(*args) or join the call in flight with the same key
+        :param key: key of the call, str for distributed calls
+        :param distributed: also coalesce across workers with a Redis lock
+        :return: result of the call
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            coroutine = self._locked(key, func, *args) if distributed else func(*args)
+            task = asyncio.ensure_future(coroutine)
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.coalesced += 1
+        # Shielded, so a cancelled caller does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller was cancelled
+            task.exception()
+
+    async def _locked(self, key: str, func: Callable[..., Awaitable], *args):
+        lock = redis.lock(LOCK_KEY.format(name=self.name, key=key), timeout=config.singleflight_lock_timeout)
+        acquired = await lock.acquire(blocking_timeout=config.singleflight_lock_timeout)
+        if not acquired:
+            logging.warning("Singleflight lock %s:%s is not released in time", self.name, key)
+        try:
+            return await func(*args)
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except LockError:
+                    # Lock expired while the call was running
+                    pass
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "calls": self.calls, "coalesced": self.coalesced}
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import mercantile
+
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    tile_data BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (zoom_level, tile_column, tile_row)
+);
+CREATE INDEX IF NOT EXISTS tiles_accessed_at ON tiles (accessed_at);
+CREATE INDEX IF NOT EXISTS tiles_fetched_at ON tiles (fetched_at);
+"""
+
+
+def tms_row(tile: mercantile.Tile) -> int:
+    # MBTiles stores rows in TMS order, which is flipped relative to XYZ
+    return (1 << tile.z) - 1 - tile.y
+
+
+class TileCache:
+    """
+    Persistent tile store in a single MBTiles (SQLite) file with TTL and size-bounded LRU eviction.
+    The file may be shared by several processes, the size is read from it before every eviction
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._connection.executemany("INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                                     [("name", "osm"), ("format", "png"), ("type", "baselayer")])
+        self.size = self._get_size()
+
+    async def get_many(self, tiles: Iterable[mercantile.Tile]) -> dict[mercantile.Tile, bytes]:
+        """
+        Get fresh tiles from the cache and mark them as recently used. SQLite calls block,
+        so they run in a thread
+        :param tiles: requested tiles
+        :return: PNG bytes of the tiles which were found
+        """
+        return await asyncio.to_thread(self._get_many, list(tiles))
+
+    async def put_many(self, tiles: dict[mercantile.Tile, bytes]) -> None:
+        if tiles:
+            await asyncio.to_thread(self._put_many, dict(tiles))
+
+    def _get_many(self, tiles: list[mercantile.Tile]) -> dict[mercantile.Tile, bytes]:
+        now = time.time()
+        found = {}
+        with self._lock:
+            for tile in tiles:
+                row = self._connection.execute(
+                    "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ? "
+                    "AND fetched_at > ?",
+                    (tile.z, tile.x, tms_row(tile), now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    found[tile] = row[0]
+            if found:
+                self._connection.executemany(
+                    "UPDATE tiles SET accessed_at = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    [(now, tile.z, tile.x, tms_row(tile)) for tile in found]
+                )
+        return found
+
+    def _put_many(self, tiles: dict[mercantile.Tile, bytes]) -> None:
+        now = time.time()
+        with self._lock:
+            # Taking the write lock first, so the size read below includes tiles put by other processes
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data, fetched_at, "
+                    "accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(tile.z, tile.x, tms_row(tile), data, now, now) for tile, data in tiles.items()]
+                )
+                self.size = self._get_size()
+                self._evict()
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _get_size(self) -> int:
+        return self._connection.execute("SELECT COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles").fetchone()[0]
+
+    def _evict(self) -> None:
+        expired_before = time.time() - self.ttl
+        expired_size = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles WHERE fetched_at <= ?", (expired_before,)
+        ).fetchone()[0]
+        if expired_size:
+            self._connection.execute("DELETE FROM tiles WHERE fetched_at <= ?", (expired_before,))
+            self.size -= expired_size
+        while self.size > self.max_bytes:
+            rows = self._connection.execute(
+                "SELECT zoom_level, tile_column, tile_row, LENGTH(tile_data) FROM tiles "
+                "ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self.size = 0
+                break
+            evicted = []
+            for row in rows:
+                if self.size <= self.max_bytes:
+                    break
+                evicted.append(row[:3])
+                self.size -= row[3]
+            self._connection.executemany(
+                "DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", evicted
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class SurfaceCache:
+    """
+    Per-process LRU of decoded tile surfaces bounded by the total size of their pixel data
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._surfaces = OrderedDict()
+
+    def get(self, tile: mercantile.Tile):
+        surface = self._surfaces.get(tile)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._surfaces.move_to_end(tile)
+        return surface
+
+    def put(self, tile: mercantile.Tile, surface) -> None:
+        surface_size = surface.get_stride() * surface.get_height()
+        if surface_size > self.max_bytes:
+            return
+        old = self._surfaces.pop(tile, None)
+        if old is not None:
+            self.size -= old.get_stride() * old.get_height()
+        self._surfaces[tile] = surface
+        self.size += surface_size
+        while self.size > self.max_bytes:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.size -= evicted.get_stride() * evicted.get_height()
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._surfaces),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+tile_cache: Optional[TileCache] = None
+surface_cache: Optional[SurfaceCache] = None
+
+
+def get_tile_cache() -> TileCache:
+    global tile_cache
+    if tile_cache is None:
+        tile_cache = TileCache(config.tile_cache_path, config.tile_cache_max_bytes, config.tile_cache_ttl)
+    return tile_cache
+
+
+def get_surface_cache() -> SurfaceCache:
+    global surface_cache
+    if surface_cache is None:
+        surface_cache = SurfaceCache(config.surface_cache_max_bytes)
+    return surface_cache
@@ -1,35 +1,113 @@
+import asyncio
 import datetime
-
-import requests
+import json
 
 import config
+from database.redis_connector import redis
+from tools.http_sessions import SharedSession
+from tools.singleflight import SingleFlight
 from translations import WEATHER_NOT_FOUND
 
+WEATHER_URL = "https://api.weatherapi.com/v1/{endpoint}.json"
+MAX_DAYS = 5
+FORECAST_DAYS = 14
+WEATHER_KEY = "weather:{lat},{lon}:{date}"
+WEATHER_STATS_KEY = "weather_cache_stats"
 
-def get_weather_for_dates(date_start: datetime.date, date_end: datetime.date, lat: float, lon: float) -> str:
-    weather = []
-    date = date_start
+weather_in_flight = SingleFlight("weather")
+weather_session = SharedSession()
+
+
+async def fetch_weather(endpoint: str, lat: float, lon: float, params: dict) -> dict:
+    async with weather_session.get().get(WEATHER_URL.format(endpoint=endpoint), params={
+        "q": f"{lat},{lon}",
+        "lang": "ru",
+        "key": config.weather_api_token,
+        **params,
+    }) as response:
+        return await response.json(content_type=None)
+
+
+async def get_weather(endpoint: str, lat: float, lon: float, **params) -> dict:
+    key = (endpoint, lat, lon, *sorted(params.items()))
+    return await weather_in_flight.do(key, fetch_weather, endpoint, lat, lon, params)
+
+
+def get_cache_ttl(endpoint: str) -> int:
+    return {
+        "history": config.weather_history_cache_ttl,
+        "forecast": config.weather_forecast_cache_ttl,
+        "future": config.weather_future_cache_ttl,
+    }[endpoint]
+
+
+async def get_weather_cache_stats() -> dict:
+    """
+    Hits and misses of the weather cache by all workers, counted in days
+    """
+    stats = {key.decode(): int(value) for key, value in (await redis.hgetall(WEATHER_STATS_KEY)).items()}
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    return {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+
+def get_days(response: dict) -> dict[str, dict]:
+    """
+    Days of the weatherapi response by date
+    """
+    try:
+        return {day["date"]: day["day"] for day in response["forecast"]["forecastday"]}
+    except (KeyError, TypeError):
+        return {}
+
+
+async def get_weather_for_dates(date_start: datetime.date, date_end: datetime.date, lat: float, lon: float) -> str:
+    """
+    Weather for the first days of the period: history for past days, forecast for today and the next 14 days
+    and future weather for later days. Days are cached in Redis for a time depending on the endpoint.
+    The forecast is requested once for all missing forecast days, the other days are requested concurrently
+    """
     now = datetime.datetime.now().date()
-    while date <= date_end and len(weather) < 5:
+    dates = []
+    date = date_start
+    while date <= date_end and len(dates) < MAX_DAYS:
+        dates.append(date)
+        date += datetime.timedelta(days=1)
+    lat, lon = round(lat, config.weather_cache_precision), round(lon, config.weather_cache_precision)
+    keys = [WEATHER_KEY.format(lat=lat, lon=lon, date=date.strftime('%Y-%m-%d')) for date in dates]
+    days = {}
+    for date, cached in zip(dates, await redis.mget(keys) if keys else []):
+        if cached is not None:
+            days[date.strftime('%Y-%m-%d')] = json.loads(cached)
+    missing = [date for date in dates if date.strftime('%Y-%m-%d') not in days]
+    # The forecast gives at most FORECAST_DAYS days starting today, the last forecast day is requested by date
+    forecast_dates = [date for date in missing if 0 <= (date - now).days < FORECAST_DAYS]
+    other_dates = [date for date in missing if date not in forecast_dates]
+    endpoints = ["history" if date < now else "forecast" if (date - now).days <= FORECAST_DAYS else "future"
+                 for date in other_dates]
+    responses = []
+    if missing:
+        requests = [get_weather(endpoint, lat, lon, dt=date.strftime('%Y-%m-%d'))
+                    for endpoint, date in zip(endpoints, other_dates)]
+        if forecast_dates:
+            endpoints.append("forecast")
+            requests.append(get_weather("forecast", lat, lon, days=(forecast_dates[-1] - now).days + 1))
+        responses = await asyncio.gather(*requests)
+    async with redis.pipeline(transaction=False) as pipeline:
+        for endpoint, response in zip(endpoints, responses):
+            for date, day in get_days(response).items():
+                days.setdefault(date, day)
+                pipeline.set(WEATHER_KEY.format(lat=lat, lon=lon, date=date), json.dumps(day),
+                             ex=get_cache_ttl(endpoint))
+        pipeline.hincrby(WEATHER_STATS_KEY, "hits", len(dates) - len(missing))
+        pipeline.hincrby(WEATHER_STATS_KEY, "misses", len(missing))
+        await pipeline.execute()
+    weather = []
+    for date in dates:
         try:
-            if date < now:
-                r = requests.get(
-                    f"https://api.weatherapi.com/v1/history.json?q={lat},{lon}&dt={date.strftime('%Y-%m-%d')}&lang=ru&key={config.weather_api_token}")
-                weather.append(
-                    f"{date.strftime('%d.%m.%Y')}: {r.json()['forecast']['forecastday'][0]['day']['condition']['text']}, {r.json()['forecast']['forecastday'][0]['day']['avgtemp_c']}°C")
-            elif date - datetime.timedelta(days=14) <= now:
-                r = requests.get(
-                    f"https://api.weatherapi.com/v1/forecast.json?q={lat},{lon}&dt={date.strftime('%Y-%m-%d')}&lang=ru&key={config.weather_api_token}")
-                weather.append(
-                    f"{date.strftime('%d.%m.%Y')}: {r.json()['forecast']['forecastday'][0]['day']['condition']['text']}, {r.json()['forecast']['forecastday'][0]['day']['avgtemp_c']}°C")
-            else:
-                r = requests.get(
-                    f"https://api.weatherapi.com/v1/future.json?q={lat},{lon}&dt={date.strftime('%Y-%m-%d')}&lang=ru&key={config.weather_api_token}")
-                weather.append(
-                    f"{date.strftime('%d.%m.%Y')}: {r.json()['forecast']['forecastday'][0]['day']['condition']['text']}, {r.json()['forecast']['forecastday'][0]['day']['avgtemp_c']}°C")
-        except (KeyError, IndexError):
+            day = days[date.strftime('%Y-%m-%d')]
+            weather.append(f"{date.strftime('%d.%m.%Y')}: {day['condition']['text']}, {day['avgtemp_c']}°C")
+        except KeyError:
             break
-        date += datetime.timedelta(days=1)
     if not weather:
         return WEATHER_NOT_FOUND
     return '\n'.join(weather)
@@ -6,6 +6,8 @@ ENTER_COUNTRY_OR_GEO = ("Теперь отправь свою страну ил
 SEND_LOCATION = "Отправить геопозицию"
 INCORRECT_COUNTRY = "Некорректная страна. Попробуй еще раз."
 INCORRECT_CITY = "Некорректный город. Попробуй еще раз."
+INCORRECT_COUNTRY_SUGGESTIONS = "Некорректная страна. Возможно, ты имел в виду: {suggestions}. Попробуй еще раз."
+INCORRECT_CITY_SUGGESTIONS = "Некорректный город. Возможно, ты имел в виду: {suggestions}. Попробуй еще раз."
 LOCATION_IS_NOT_RECOGNIZED = "Геопозиция не распознана. Отправь страну текстом."
 COUNTRY_AND_CITY_RESPONSE = "Твоя страна {country} и город {city} сохранены."
 ENTER_CITY = "Теперь отправь свой город."
@@ -45,6 +47,7 @@ TRAVEL_LOCATION_INFO = ("Информация о точке путешестви
                         "{food_places}")
 WRONG_DATE_FORMAT = "Неверный формат даты. Попробуй еще раз."
 WEATHER_NOT_FOUND = "Погода не найдена."
+WEATHER_UNAVAILABLE = "Погода сейчас недоступна, попробуй позже."
 SEND_USER_FORWARD = "Перешли сообщение от пользователя, которого хочешь добавить в путешествие."
 SEND_USER_NOT_FORWARDED = ("Ты не переслал сообщение от пользователя или этот пользователь не зарегистрирован в боте. "
                            "Попробуй еще раз.")
@@ -57,4 +60,5 @@ INTERESTING_PLACE = "· {name} - {address}\n"
 INTERESTING_PLACES_NOT_FOUND = "Интересные места не найдены."
 FOOD_PLACE = "· {name} - {address}, оценка: {rate}*\n"
 FOOD_PLACES_NOT_FOUND = "Кафе и рестораны не найдены."
+PLACES_UNAVAILABLE = "Места сейчас недоступны, попробуй позже."
 LOADING = "Загрузка..."